@@ -0,0 +1,273 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from fake_services import FakeServices
+from speculation import summarize_stats
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "coordination.py")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_workers(services, workdir, count, extra_env=None, ready_timeout=60):
+    """
+    Start worker nodes (coordination.py) that share the runs of main.py through the fake S3.
+
+    Waits until every worker is polling for work, so their imports are not timed as part
+    of the first run.
+
+    Returns:
+    - list: The worker processes.
+    """
+    env = {**os.environ, **services.env(), "PYTHONUNBUFFERED": "1", **(extra_env or {})}
+    workers = []
+    for index in range(count):
+        worker_dir = os.path.join(workdir, f"worker-{index}")
+        os.makedirs(worker_dir, exist_ok=True)
+        with open(os.path.join(worker_dir, "output.log"), "w") as log:
+            workers.append(subprocess.Popen(
+                [sys.executable, WORKER_PATH, "--worker-id", f"bench-worker-{index}"],
+                cwd=worker_dir, env=env, stdout=log, stderr=subprocess.STDOUT,
+            ))
+    deadline = time.monotonic() + ready_timeout
+    for index, worker in enumerate(workers):
+        log_path = os.path.join(workdir, f"worker-{index}", "output.log")
+        while worker.poll() is None and time.monotonic() < deadline:
+            with open(log_path) as log:
+                if "polling" in log.read():
+                    break
+            time.sleep(0.1)
+        else:
+            print(f"Worker {index} is not ready; see {log_path}.")
+    return workers
+
+
+def stop_workers(workers):
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        try:
+            worker.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+
+
+def run_once(services, workdir, run_index, extra_env=None):
+    """
+    Run main.py once in a subprocess against the fake services.
+
+    Parameters:
+    - services (FakeServices): Running stand-ins.
+    - workdir (str): Working directory for the run's output files.
+    - run_index (int): Index used to name the run's output directory.
+    - extra_env (dict): Additional environment variables for main.py.
+
+    Returns:
+    - dict: {"wall_seconds", "stages", "counters", "requests", "speculation", "returncode"}.
+    """
+    services.reset()
+    run_dir = os.path.join(workdir, f"run-{run_index}")
+    os.makedirs(run_dir, exist_ok=True)
+    env = {
+        **os.environ,
+        **services.env(),
+        "TRACING_ENABLED": "1",
+        "TRACE_DIR": os.path.join(run_dir, "traces"),
+        "PROMETHEUS_METRICS_PATH": os.path.join(run_dir, "metrics.prom"),
+        "PYTHONUNBUFFERED": "1",
+        **(extra_env or {}),
+    }
+
+    start = time.perf_counter()
+    with open(os.path.join(run_dir, "output.log"), "w") as log:
+        process = subprocess.run([sys.executable, MAIN_PATH], cwd=run_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    wall_seconds = time.perf_counter() - start
+
+    traces = glob.glob(os.path.join(run_dir, "traces", "*.json"))
+    trace = json.load(open(traces[0])) if traces else {"stages": {}, "counters": []}
+    return {
+        "wall_seconds": wall_seconds,
+        "stages": {name: stats["total_seconds"] for name, stats in trace["stages"].items()},
+        "counters": trace["counters"],
+        "requests": services.request_counts(),
+        "speculation": summarize_stats(os.path.join(run_dir, "metrics", "speculation.jsonl")),
+        "returncode": process.returncode,
+    }
+
+
+def summarize(runs):
+    """
+    Reduce individual runs to per-stage medians.
+
+    Returns:
+    - dict: {"end_to_end", "startup", "stages", "requests", "runs"}, timings in seconds.
+    """
+    stage_names = sorted({name for run in runs for name in run["stages"]})
+    stages = {name: statistics.median(run["stages"].get(name, 0.0) for run in runs) for name in stage_names}
+    # Time outside the traced pipeline: interpreter start, imports and model loading.
+    startup = statistics.median(run["wall_seconds"] - run["stages"].get("run", 0.0) for run in runs)
+    return {
+        "end_to_end": statistics.median(run["wall_seconds"] for run in runs),
+        "startup": startup,
+        "stages": stages,
+        "requests": runs[-1]["requests"],
+        "runs": runs,
+    }
+
+
+def compare(report, baseline, tolerance, min_delta):
+    """
+    Find stages that got slower than the baseline report.
+
+    Parameters:
+    - report (dict): Current summary.
+    - baseline (dict): Previous summary, as written by --output.
+    - tolerance (float): Allowed relative slowdown, e.g. 0.2 for 20%.
+    - min_delta (float): Ignore slowdowns smaller than this many seconds.
+
+    Returns:
+    - list: (name, baseline_seconds, current_seconds) for each regression.
+    """
+    current = {"end_to_end": report["end_to_end"], "startup": report["startup"], **report["stages"]}
+    previous = {"end_to_end": baseline["end_to_end"], "startup": baseline["startup"], **baseline["stages"]}
+    regressions = []
+    for name, seconds in current.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        if seconds > before * (1 + tolerance) and seconds - before > min_delta:
+            regressions.append((name, before, seconds))
+    return regressions
+
+
+def print_report(report, baseline=None):
+    rows = [("end_to_end", report["end_to_end"]), ("startup", report["startup"])] + sorted(report["stages"].items())
+    previous = {}
+    if baseline:
+        previous = {"end_to_end": baseline["end_to_end"], "startup": baseline["startup"], **baseline["stages"]}
+    print(f"{'stage':<20}{'median (s)':>12}{'baseline (s)':>14}")
+    for name, seconds in rows:
+        before = f"{previous[name]:>14.3f}" if name in previous else f"{'-':>14}"
+        print(f"{name:<20}{seconds:>12.3f}{before}")
+    print("Requests per service (last run): " + ", ".join(f"{k}={v}" for k, v in report["requests"].items()))
+    speculated = [run["speculation"] for run in report["runs"] if run.get("speculation")]
+    if speculated:
+        hits = sum(stats["hit_rate"] * stats["runs"] for stats in speculated)
+        runs = sum(stats["runs"] for stats in speculated)
+        saved = statistics.median(stats["saved_seconds"] for stats in speculated)
+        wasted = statistics.median(stats["wasted_seconds"] for stats in speculated)
+        print(f"Speculative drafts: hit rate {hits / runs:.0%}, median saved {saved:.2f}s, "
+              f"median spent on discarded drafts {wasted:.2f}s")
+
+
+def run_benchmark(args, extra_env, workdir):
+    """
+    Run main.py args.runs times in workdir and print the report.
+
+    Exits with code 2 if a run fails, after printing the end of its output.
+
+    Returns:
+    - tuple: (report, baseline); baseline is None without --baseline.
+    """
+    runs = []
+    with FakeServices(
+        articles_per_source=args.articles,
+        source_latency=args.source_latency,
+        llm_latency=args.llm_latency,
+        tokens_per_second=args.tokens_per_second,
+        api_latency=args.api_latency,
+        selection_delay=args.selection_delay,
+    ) as services:
+        # Workers are started once and poll the bucket between runs, so their startup is not timed.
+        workers = start_workers(services, workdir, args.nodes - 1, extra_env)
+        try:
+            for run_index in range(args.runs):
+                result = run_once(services, workdir, run_index, extra_env)
+                print(f"Run {run_index + 1}/{args.runs}: {result['wall_seconds']:.2f}s (exit code {result['returncode']})")
+                if result["returncode"] != 0:
+                    with open(os.path.join(workdir, f"run-{run_index}", "output.log")) as log:
+                        print("main.py failed; last lines of its output:\n" + "".join(log.readlines()[-20:]))
+                    if not args.keep:
+                        print("Re-run with --keep to inspect the run directories.")
+                    sys.exit(2)
+                runs.append(result)
+        finally:
+            stop_workers(workers)
+
+    report = summarize(runs)
+    report["config"] = vars(args)
+    baseline = json.load(open(args.baseline)) if args.baseline else None
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Summary written to '{args.output}'.")
+    return report, baseline
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of main.py against local fake services.")
+    parser.add_argument("--runs", type=int, default=3, help="Number of end-to-end runs.")
+    parser.add_argument("--articles", type=int, default=10, help="Articles served per source.")
+    parser.add_argument("--source-latency", type=float, default=0.02, help="Latency of each news site request (s).")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Fixed latency of each LLM request (s).")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="Simulated LLM generation speed.")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="Latency of Telegram/Medium/Blogger/S3 requests (s).")
+    parser.add_argument("--selection-delay", type=float, default=0.5, help="Seconds until the fake user picks a topic.")
+    parser.add_argument("--telegram-webhook", action="store_true", help="Receive the topic selection via webhook.")
+    parser.add_argument("--crawl-delay", type=float, default=0.0, help="CRAWL_DELAY passed to the crawler.")
+    parser.add_argument("--with-image", action="store_true", help="Run Stable Diffusion (requires a GPU).")
+    parser.add_argument("--speculate", type=int, default=0,
+                        help="Draft this many top-ranked topics while waiting for the selection.")
+    parser.add_argument("--nodes", type=int, default=1,
+                        help="Nodes sharing each run: main.py plus N-1 coordination.py workers.")
+    parser.add_argument("--output", help="Write the summary JSON here.")
+    parser.add_argument("--baseline", help="Summary JSON from a previous release to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before failing.")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Ignore slowdowns below this many seconds.")
+    parser.add_argument("--keep", action="store_true", help="Keep the run directories for inspection.")
+    args = parser.parse_args()
+
+    extra_env = {
+        "CRAWL_DELAY": str(args.crawl_delay),
+        "IMAGE_GENERATION_ENABLED": "1" if args.with_image else "0",
+        "SPECULATION_CANDIDATES": str(args.speculate),
+    }
+    if args.nodes > 1:
+        extra_env.update({"CLUSTER_ENABLED": "1", "CLUSTER_POLL_INTERVAL": "0.1", "CLUSTER_LEASE_SECONDS": "30"})
+    if args.telegram_webhook:
+        port = free_port()
+        extra_env["TELEGRAM_WEBHOOK_URL"] = f"http://127.0.0.1:{port}/telegram-webhook"
+        extra_env["TELEGRAM_WEBHOOK_LISTEN"] = f"127.0.0.1:{port}"
+    workdir = tempfile.mkdtemp(prefix="autoblog-bench-")
+    try:
+        report, baseline = run_benchmark(args, extra_env, workdir)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"Run directories kept in '{workdir}'.")
+
+    if baseline:
+        regressions = compare(report, baseline, args.tolerance, args.min_delta)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
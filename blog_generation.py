@@ -1,3 +1,5 @@
+from llm import llama
+
 def generate_blog_with_references(top_topic, data):
     """
     Generate a detailed blog post based on a selected topic and associated content.
@@ -9,6 +11,18 @@ def generate_blog_with_references(top_topic, data):
     Returns:
     - blog_post (str): The generated blog post.
     """
+    blog_post = draft_blog_post(top_topic, data)
+    if blog_post is None:
+        return None
+    return refine_blog_post(blog_post)
+
+def draft_blog_post(top_topic, data):
+    """
+    First LLM pass of generate_blog_with_references: write the blog post from the reference content.
+
+    Returns:
+    - blog_post (str): The draft, or None if the data has no content for the topic.
+    """
     # Retrieve content associated with the top topic
     def get_content_for_topic(data, topic):
         for publication, articles in data.items():
@@ -44,9 +58,15 @@ def generate_blog_with_references(top_topic, data):
     )
 
     # Use LLM API for blog generation
-    blog_post = llama(prompt_or_messages=prompt, max_tokens=4096, temperature=0.6)
+    return llama(prompt_or_messages=prompt, max_tokens=4096, temperature=0.6)
+
+def refine_blog_post(blog_post):
+    """
+    Second LLM pass of generate_blog_with_references: refine the draft into HTML-headed content.
 
-    # Second LLM pass for content refinement
+    Returns:
+    - refined_blog_post (str): The refined blog post.
+    """
     refinement_prompt = (
         f"Refine the following blog post for better readability, coherence, and completeness. Remove redundancy, ensure all sentences are complete, "
         f"and make it concise without losing important details. The output format should include headings as HTML-like tags (e.g., <h1>, <h2>). "
@@ -1,9 +1,18 @@
+import json
+import threading
+import httplib2
+from datetime import datetime
 from googleapiclient.discovery import build
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
+
+# Well below the outbox lease, so a hung request cannot outlive its claim on a post.
+REQUEST_TIMEOUT = 60
 
 class BloggerIntegration:
-    def __init__(self, client_id, client_secret, scopes, token_uri, refresh_token, blog_id):
+    def __init__(self, client_id, client_secret, scopes, token_uri, refresh_token, blog_id, api_endpoint=None,
+                 s3_manager=None, token_path="blogger_access_token.json"):
         """
         Initialize BloggerIntegration.
 
@@ -14,6 +23,10 @@ class BloggerIntegration:
         - token_uri (str): Google token URI.
         - refresh_token (str): Refresh token for authentication.
         - blog_id (str): Blogger Blog ID.
+        - api_endpoint (str): Override for the Blogger API base URL, e.g. a local stand-in.
+        - s3_manager (S3Manager): If given, access tokens are shared through S3 so that
+          other posts and processes reuse them instead of refreshing their own.
+        - token_path (str): Path in the S3 bucket of the shared access token.
         """
         self.client_id = client_id
         self.client_secret = client_secret
@@ -21,31 +34,86 @@ class BloggerIntegration:
         self.token_uri = token_uri
         self.refresh_token = refresh_token
         self.blog_id = blog_id
+        self.api_endpoint = api_endpoint
+        self.s3_manager = s3_manager
+        self.token_path = token_path
         self.credentials = None
+        self.service = None
+        self._shared_token = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
 
     def get_credentials(self):
         """
-        Obtain valid Google API credentials using the refresh token.
+        Obtain valid Google API credentials.
+
+        The current access token is reused until it expires. After that a token shared
+        through S3 is used if it is still valid, and only then is the refresh token used.
+        A newly refreshed token is written back to S3.
 
         Returns:
         - Credentials: Google API credentials if successful, None otherwise.
         """
-        try:
-            self.credentials = Credentials(
-                None,
-                refresh_token=self.refresh_token,
-                client_id=self.client_id,
-                client_secret=self.client_secret,
-                token_uri=self.token_uri,
-                scopes=self.scopes
-            )
-
-            if not self.credentials.valid:
-                self.credentials.refresh(Request())
-            return self.credentials
-        except Exception as e:
-            print(f"Error refreshing credentials: {e}")
-            return None
+        with self._lock:
+            try:
+                if self.credentials is None:
+                    self.credentials = Credentials(
+                        None,
+                        refresh_token=self.refresh_token,
+                        client_id=self.client_id,
+                        client_secret=self.client_secret,
+                        token_uri=self.token_uri,
+                        scopes=self.scopes
+                    )
+
+                if not self.credentials.valid:
+                    self._load_shared_token()
+                if not self.credentials.valid:
+                    self.credentials.refresh(Request())
+                    self._save_shared_token()
+                return self.credentials
+            except Exception as e:
+                print(f"Error refreshing credentials: {e}")
+                return None
+
+    def get_service(self):
+        """
+        Return the Blogger API client, building it on first use.
+
+        The client is built from the discovery document bundled with
+        google-api-python-client, so no discovery request is made, and it is reused
+        for every later post. Token refreshes update the shared credentials object
+        in place, so the cached client stays valid.
+
+        Requests must be executed with http=self.get_http(): the client's own httplib2
+        transport is not thread-safe.
+
+        Returns:
+        - Resource: The Blogger v3 service.
+        """
+        with self._lock:
+            if self.service is None:
+                client_options = {"api_endpoint": self.api_endpoint} if self.api_endpoint else None
+                self.service = build(
+                    "blogger", "v3",
+                    credentials=self.credentials,
+                    client_options=client_options,
+                    static_discovery=True,
+                    cache_discovery=False,
+                )
+            return self.service
+
+    def get_http(self):
+        """
+        Return this thread's authorized HTTP transport, so concurrent posts never share one.
+
+        Returns:
+        - AuthorizedHttp: Transport signing requests with the shared credentials.
+        """
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=REQUEST_TIMEOUT))
+        return http
 
     def create_blog_post(self, title, content):
         """
@@ -58,24 +126,48 @@ class BloggerIntegration:
         Returns:
         - dict: Response JSON from Blogger API if successful, None otherwise.
         """
-        if not self.credentials:
+        if not self.get_credentials():
             print("Credentials are not valid. Unable to create post.")
             return None
 
         try:
-            service = build("blogger", "v3", credentials=self.credentials)
             post = {
                 "title": title,
                 "content": content
             }
 
-            result = service.posts().insert(blogId=self.blog_id, body=post).execute()
+            result = self.get_service().posts().insert(blogId=self.blog_id, body=post).execute(http=self.get_http())
             print(f"Blog post published successfully! URL: {result['url']}")
+            # The client refreshes the token itself on a 401; share the new one too.
+            with self._lock:
+                if self.credentials.token != self._shared_token:
+                    self._save_shared_token()
             return result
         except Exception as e:
             print(f"Error creating blog post: {e}")
             return None
 
+    def _load_shared_token(self):
+        if self.s3_manager is None:
+            return
+        stored = self.s3_manager.load_token_from_s3(self.token_path)
+        if not stored:
+            return
+        try:
+            token = json.loads(stored)
+            self.credentials.token = token["token"]
+            self.credentials.expiry = datetime.fromisoformat(token["expiry"])
+            self._shared_token = token["token"]
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring malformed shared Blogger token: {e}")
+
+    def _save_shared_token(self):
+        if self.s3_manager is None or not self.credentials.token or not self.credentials.expiry:
+            return
+        token = {"token": self.credentials.token, "expiry": self.credentials.expiry.isoformat()}
+        if self.s3_manager.save_token_to_s3(self.token_path, json.dumps(token)):
+            self._shared_token = self.credentials.token
+
 if __name__ == "__main__":
     # Replace with your actual Google credentials and blog details
     CLIENT_ID = "your_google_client_id_here"
@@ -0,0 +1,26 @@
+import pytest
+from fake_services import FakeS3
+from s3_manager import S3Manager, MIN_PART_SIZE
+
+
+@pytest.fixture(scope="session")
+def fake_s3():
+    s3 = FakeS3().start()
+    yield s3
+    s3.stop()
+
+
+@pytest.fixture
+def s3_manager(fake_s3, tmp_path):
+    fake_s3.reset()
+    env = fake_s3.env()
+    return S3Manager(
+        aws_access_key_id=env["AWS_ACCESS_KEY_ID"],
+        aws_secret_access_key=env["AWS_SECRET_ACCESS_KEY"],
+        region_name=env["AWS_REGION_NAME"],
+        bucket_name=env["S3_BUCKET_NAME"],
+        endpoint_url=env["S3_ENDPOINT_URL"],
+        cache_dir=str(tmp_path / "cache"),
+        part_size=MIN_PART_SIZE,
+        max_workers=4,
+    )
@@ -0,0 +1,401 @@
+import argparse
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from data_preparation import SOURCES, list_source_articles, fetch_source_articles, extract_topic
+from blog_generation import (
+    generate_blog_with_references,
+    generate_title,
+    generate_trending_tags,
+    generate_image_prompt,
+)
+from instrumentation import tracer
+
+class WorkQueue:
+    def __init__(self, s3_manager, prefix="cluster/", worker_id=None, lease_seconds=60.0, poll_interval=0.5):
+        """
+        Initialize the WorkQueue.
+
+        Several nodes share pipeline work through objects in one S3 bucket. A run
+        publishes the tasks of a stage under `{prefix}runs/{run_id}/{stage}/tasks/`.
+        A node that wants a task creates its lease object with a create-only write
+        (If-None-Match), so exactly one node wins. While the task runs, the lease is
+        renewed with compare-and-swap writes (If-Match). The output goes to
+        `results/`, then the lease is marked done so it can never be claimed again.
+        A lease that is not renewed before
+        it expires (crashed or partitioned node) is taken over by whichever node
+        swaps it first. Lease expiry uses each node's clock, so lease_seconds should
+        be well above the expected clock skew.
+
+        Parameters:
+        - s3_manager (S3Manager): Bucket shared by every node.
+        - prefix (str): Key prefix for coordination objects.
+        - worker_id (str): Name of this node in leases; defaults to host name and PID.
+        - lease_seconds (float): Lease duration; renewed every third of it while a task runs.
+        - poll_interval (float): Seconds between scans when there is nothing to claim.
+        """
+        self.s3 = s3_manager
+        self.prefix = prefix
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        # Lease expiry times seen by this node, per run, so live or finished leases are not probed again.
+        self._known_leases = {}
+        # Task IDs per (run_id, stage); a stage is only announced once all of its tasks are published.
+        self._stage_tasks = {}
+
+    def start_run(self, run_id):
+        """Announce a run so that idle workers start polling its stages."""
+        self.s3.put_json(self._active_key(run_id), {"run_id": run_id, "coordinator": self.worker_id, "stage": None})
+
+    def finish_run(self, run_id):
+        """Stop announcing a run. Its tasks and results stay in the bucket for inspection."""
+        self.s3.delete_object(self._active_key(run_id))
+        self._forget(run_id)
+
+    def active_runs(self):
+        """
+        Runs currently announced in the bucket.
+
+        Returns:
+        - list: Manifests ({"run_id", "coordinator", "stage"}) of the active runs.
+        """
+        manifests = []
+        for key in self.s3.list_keys(f"{self.prefix}active/"):
+            manifest, _ = self.s3.get_json(key)
+            if manifest:
+                manifests.append(manifest)
+        return manifests
+
+    def map(self, run_id, stage, payloads, handler):
+        """
+        Run one task per payload across every node and merge the results.
+
+        The calling node publishes the tasks, works on them like any other node and
+        returns once every task has a result, taking over tasks whose lease expired.
+
+        Parameters:
+        - run_id (str): The run.
+        - stage (str): Stage name; workers look up their handler by this name.
+        - payloads (dict): {task_id: JSON-serializable payload}. Task IDs must be valid key segments.
+        - handler (callable): Function of a payload returning a JSON-serializable value.
+
+        Returns:
+        - dict: {task_id: value}, with None for tasks whose handler raised.
+        """
+        if not payloads:
+            return {}
+        with tracer.span("cluster_stage", stage=stage, tasks=len(payloads)):
+            with ThreadPoolExecutor(max_workers=min(8, len(payloads))) as executor:
+                list(executor.map(
+                    lambda item: self.s3.put_json(self._key(run_id, stage, "tasks", item[0]), item[1]), payloads.items()
+                ))
+            self.s3.put_json(self._active_key(run_id), {"run_id": run_id, "coordinator": self.worker_id, "stage": stage})
+
+            task_ids = set(payloads)
+            while True:
+                done = self._ids(run_id, stage, "results")
+                if done >= task_ids:
+                    break
+                if not self._work_pending(run_id, stage, sorted(task_ids - done), handler):
+                    time.sleep(self.poll_interval)
+
+            with ThreadPoolExecutor(max_workers=min(8, len(task_ids))) as executor:
+                results = dict(zip(sorted(task_ids), executor.map(
+                    lambda task_id: self.s3.get_json(self._key(run_id, stage, "results", task_id))[0], sorted(task_ids)
+                )))
+        merged = {}
+        for task_id, result in results.items():
+            if result is None or not result.get("ok"):
+                print(f"Task {stage}/{task_id} failed: {(result or {}).get('error', 'result missing')}")
+                merged[task_id] = None
+            else:
+                merged[task_id] = result["value"]
+        return merged
+
+    def work(self, run_id, stage, handler):
+        """
+        Run the first unfinished task of a stage that this node can claim.
+
+        Returns:
+        - int: 1 if this node completed a task, 0 if there was nothing to claim.
+        """
+        if (run_id, stage) not in self._stage_tasks:
+            self._stage_tasks[(run_id, stage)] = self._ids(run_id, stage, "tasks")
+        pending = sorted(self._stage_tasks[(run_id, stage)] - self._ids(run_id, stage, "results"))
+        return self._work_pending(run_id, stage, pending, handler)
+
+    def serve(self, handlers, stop_event=None):
+        """
+        Work on the stages of announced runs until stopped.
+
+        Parameters:
+        - handlers (dict): {stage: handler}, e.g. HANDLERS.
+        - stop_event (threading.Event): Set to stop after the current task.
+        """
+        stop_event = stop_event or threading.Event()
+        print(f"Worker {self.worker_id} polling '{self.prefix}' for work.")
+        while not stop_event.is_set():
+            completed = 0
+            manifests = self.active_runs()
+            active = {manifest["run_id"] for manifest in manifests}
+            for run_id in {run_id for run_id, _ in self._stage_tasks} | set(self._known_leases):
+                if run_id not in active:
+                    self._forget(run_id)
+            for manifest in manifests:
+                handler = handlers.get(manifest.get("stage"))
+                if handler is None:
+                    continue
+                while not stop_event.is_set() and self.work(manifest["run_id"], manifest["stage"], handler):
+                    completed += 1
+            if not completed:
+                stop_event.wait(self.poll_interval)
+
+    def _work_pending(self, run_id, stage, pending, handler):
+        # Visit tasks in a different order on every node so nodes rarely contend for the same lease.
+        # Return after one task so the next pass starts from a fresh listing.
+        pending = list(pending)
+        random.shuffle(pending)
+        for task_id in pending:
+            lease = self._claim(run_id, stage, task_id)
+            if lease is not None:
+                return 1 if self._process(lease, handler) else 0
+        return 0
+
+    def _claim(self, run_id, stage, task_id):
+        key = self._key(run_id, stage, "leases", task_id)
+        known = self._known_leases.setdefault(run_id, {})
+        if known.get(key, 0) > time.time():
+            return None
+        etag = self.s3.put_json(key, self._lease_record(), if_none_match=True)
+        if etag is None:
+            current, current_etag = self.s3.get_json(key)
+            if current is None:
+                return None
+            if current.get("done"):
+                known[key] = float("inf")
+                return None
+            if current["expires_at"] > time.time():
+                known[key] = current["expires_at"]
+                return None
+            etag = self.s3.put_json(key, self._lease_record(), if_match=current_etag)
+            if etag is None:
+                return None
+            tracer.count("lease_takeovers", 1, stage=stage)
+            print(f"Took over {stage}/{task_id} from {current['worker']} after its lease expired.")
+        return {"run_id": run_id, "stage": stage, "task_id": task_id, "key": key, "etag": etag}
+
+    def _process(self, lease, handler):
+        run_id, stage, task_id = lease["run_id"], lease["stage"], lease["task_id"]
+        payload, _ = self.s3.get_json(self._key(run_id, stage, "tasks", task_id))
+        lost = threading.Event()
+        finished = threading.Event()
+
+        def heartbeat():
+            while not finished.wait(self.lease_seconds / 3):
+                etag = self.s3.put_json(lease["key"], self._lease_record(), if_match=lease["etag"])
+                if etag is None:
+                    lost.set()
+                    return
+                lease["etag"] = etag
+
+        renewer = threading.Thread(target=heartbeat, name=f"lease-{task_id}", daemon=True)
+        renewer.start()
+        try:
+            with tracer.span("cluster_task", stage=stage, task=task_id, worker=self.worker_id):
+                try:
+                    result = {"ok": True, "value": handler(payload)}
+                except Exception as e:
+                    print(f"Task {stage}/{task_id} raised: {e}")
+                    result = {"ok": False, "error": str(e)}
+        finally:
+            finished.set()
+            renewer.join()
+
+        # The lease may have been taken over since the last heartbeat, so renew it once more
+        # before writing; the result is only written while this node still holds the lease.
+        etag = None if lost.is_set() else self.s3.put_json(lease["key"], self._lease_record(), if_match=lease["etag"])
+        if etag is None:
+            # Another node took the task over; its result is the one that counts.
+            print(f"Lost the lease on {stage}/{task_id}; discarding this node's result.")
+            return False
+        result["worker"] = self.worker_id
+        if self.s3.put_json(self._key(run_id, stage, "results", task_id), result) is None:
+            return False
+        done = {"worker": self.worker_id, "done": True, "expires_at": 0}
+        if self.s3.put_json(lease["key"], done, if_match=etag) is None:
+            # Taken over while the result was being written: the new owner's result replaces this one.
+            print(f"Lost the lease on {stage}/{task_id} while writing its result; not counting it.")
+            return False
+        tracer.count("cluster_tasks", 1, stage=stage)
+        return True
+
+    def _forget(self, run_id):
+        self._known_leases.pop(run_id, None)
+        for key in [key for key in self._stage_tasks if key[0] == run_id]:
+            del self._stage_tasks[key]
+
+    def _lease_record(self):
+        return {"worker": self.worker_id, "expires_at": time.time() + self.lease_seconds}
+
+    def _ids(self, run_id, stage, kind):
+        prefix = self._stage_prefix(run_id, stage, kind)
+        return {key[len(prefix):-len(".json")] for key in self.s3.list_keys(prefix) if key.endswith(".json")}
+
+    def _stage_prefix(self, run_id, stage, kind):
+        return f"{self.prefix}runs/{run_id}/{stage}/{kind}/"
+
+    def _key(self, run_id, stage, kind, task_id):
+        return f"{self._stage_prefix(run_id, stage, kind)}{task_id}.json"
+
+    def _active_key(self, run_id):
+        return f"{self.prefix}active/{run_id}.json"
+
+# Stage handlers, shared by the coordinating run and the worker nodes.
+
+def crawl_index(payload):
+    return list_source_articles(payload["source"])
+
+def crawl_pages(payload):
+    return fetch_source_articles(payload["source"], payload["stubs"])
+
+def extract_batch_topics(payload):
+    return [extract_topic(article) for article in payload["articles"]]
+
+def generate_post(payload):
+    blog_post = generate_blog_with_references(payload["topic"], payload["data"])
+    if not blog_post:
+        return None
+    return {
+        "blog_post": blog_post,
+        "title": generate_title(blog_post),
+        "tags": generate_trending_tags(blog_post),
+        "image_prompt": generate_image_prompt(blog_post),
+    }
+
+HANDLERS = {
+    "index": crawl_index,
+    "pages": crawl_pages,
+    "topics": extract_batch_topics,
+    "generate": generate_post,
+}
+
+class ClusterRun:
+    def __init__(self, queue, run_id=None, batch_size=4):
+        """
+        One pipeline run whose crawling, topic extraction and post generation are
+        spread over every node polling the same WorkQueue.
+
+        Parameters:
+        - queue (WorkQueue): The shared queue.
+        - run_id (str): Unique ID of the run.
+        - batch_size (int): Article pages or topic extractions per task.
+        """
+        self.queue = queue
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.batch_size = batch_size
+
+    def __enter__(self):
+        self.queue.start_run(self.run_id)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.queue.finish_run(self.run_id)
+        return False
+
+    def gather_articles(self):
+        """
+        Crawl every source: one task per source index, then tasks of `batch_size` article pages.
+
+        Returns:
+        - dict: Articles keyed by source, in the same order as a single-node crawl.
+        """
+        sources = list(SOURCES)
+        index = self.queue.map(
+            self.run_id, "index", {f"{i:03d}": {"source": source} for i, source in enumerate(sources)}, crawl_index
+        )
+        data = {}
+        payloads = {}
+        for i, source in enumerate(sources):
+            stubs = index[f"{i:03d}"] or []
+            data[source] = []
+            if SOURCES[source][1] is None:
+                data[source] = stubs
+                continue
+            for start in range(0, len(stubs), self.batch_size):
+                payloads[f"{i:03d}-{start // self.batch_size:04d}"] = {
+                    "source": source, "stubs": stubs[start:start + self.batch_size]
+                }
+        pages = self.queue.map(self.run_id, "pages", payloads, crawl_pages)
+        for task_id in sorted(pages):
+            data[payloads[task_id]["source"]].extend(pages[task_id] or [])
+        for source, articles in data.items():
+            tracer.count("articles", len(articles), source=source)
+        return data
+
+    def extract_topics(self, data):
+        """
+        Extract the main topic of every article in tasks of `batch_size` articles.
+
+        Returns:
+        - dict: The same data with a "main_topic" field added to each article.
+        """
+        positions = [(source, i) for source, articles in data.items() for i in range(len(articles))]
+        batches = [positions[start:start + self.batch_size] for start in range(0, len(positions), self.batch_size)]
+        payloads = {
+            f"{n:04d}": {"articles": [data[source][i] for source, i in batch]} for n, batch in enumerate(batches)
+        }
+        results = self.queue.map(self.run_id, "topics", payloads, extract_batch_topics)
+        for n, batch in enumerate(batches):
+            extracted = results[f"{n:04d}"]
+            for (source, i), article in zip(batch, extracted or []):
+                data[source][i] = article
+        return data
+
+    def generate_post(self, topic, data):
+        """
+        Generate the blog post, title, tags and image prompt on whichever node claims the task.
+
+        Returns:
+        - dict: {"blog_post", "title", "tags", "image_prompt"}, or None if generation failed.
+        """
+        references = {
+            source: [article for article in articles if article.get("main_topic") == topic]
+            for source, articles in data.items()
+        }
+        payload = {"topic": topic, "data": {source: articles for source, articles in references.items() if articles}}
+        return self.queue.map(self.run_id, "generate", {"0000": payload}, generate_post)["0000"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a worker node that takes pipeline tasks from the shared S3 queue.")
+    parser.add_argument("--worker-id", default=None, help="Name of this node in leases.")
+    args = parser.parse_args()
+
+    from main import load_settings
+    from s3_manager import S3Manager
+
+    settings = load_settings()
+    s3_manager = S3Manager(
+        aws_access_key_id=settings["AWS_ACCESS_KEY_ID"],
+        aws_secret_access_key=settings["AWS_SECRET_ACCESS_KEY"],
+        region_name=settings["AWS_REGION_NAME"],
+        bucket_name=settings["S3_BUCKET_NAME"],
+        endpoint_url=settings["S3_ENDPOINT_URL"],
+        cache_dir=settings["S3_CACHE_DIR"],
+    )
+    queue = WorkQueue(
+        s3_manager,
+        prefix=settings["CLUSTER_PREFIX"],
+        worker_id=args.worker_id,
+        lease_seconds=settings["CLUSTER_LEASE_SECONDS"],
+        poll_interval=settings["CLUSTER_POLL_INTERVAL"],
+    )
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+    queue.serve(HANDLERS, stop)
@@ -0,0 +1,293 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Neither module exists on Windows: only in-process overlap protection applies there,
+# and memory is reported as nan.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# A cron invocation pays for these imports on every run; the daemon pays once.
+_imports_started = time.perf_counter()
+from main import load_settings, create_integrations, run_traced
+from image_generation import load_image_pipeline
+from embedding_model import get_model
+IMPORT_SECONDS = time.perf_counter() - _imports_started
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or nan where it cannot be measured."""
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class RunLock:
+    def __init__(self, path):
+        """
+        Cross-process lock so two daemon processes never run the pipeline at the same time.
+
+        Parameters:
+        - path (str): Lock file path.
+        """
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        """
+        Try to take the lock without waiting.
+
+        Returns:
+        - bool: True if the lock was acquired, False if another process holds it.
+        """
+        if fcntl is None:
+            return True
+        self._file = open(self.path, "a")
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class BlogDaemon:
+    def __init__(self, interval_minutes=None, daily_at=None, lock_path="auto_blog_studio.lock",
+                 stats_path="metrics/daemon_runs.jsonl", run_on_start=False, max_runs=None):
+        """
+        Initialize the BlogDaemon.
+
+        Parameters:
+        - interval_minutes (float): Run every this many minutes.
+        - daily_at (list): Times of day ("HH:MM") to run at.
+        - lock_path (str): Lock file guarding against overlapping runs.
+        - stats_path (str): JSON lines file receiving per-run latency and memory.
+        - run_on_start (bool): Trigger a run as soon as the daemon is warm.
+        - max_runs (int): Exit after this many runs (useful for benchmarking).
+        """
+        if not interval_minutes and not daily_at:
+            raise ValueError("Configure interval_minutes and/or daily_at.")
+        self.interval = timedelta(minutes=interval_minutes) if interval_minutes else None
+        self.daily_at = [datetime.strptime(value, "%H:%M").time() for value in (daily_at or [])]
+        self.file_lock = RunLock(lock_path)
+        self.stats_path = stats_path
+        self.run_on_start = run_on_start
+        self.max_runs = max_runs
+
+        self.settings = None
+        self.integrations = None
+        self.startup_seconds = None
+        self.runs = []
+        self.started_runs = 0
+        self.last_trigger = None
+        self._run_lock = threading.Lock()
+        self._run_thread = None
+        self._stop = threading.Event()
+
+    def warm_up(self):
+        """
+        Load everything a cron invocation would reload on each run: service clients,
+        HTTP sessions, credentials, the SentenceTransformer model and, when enabled,
+        the Stable Diffusion weights. startup_seconds includes the module imports.
+        """
+        start = time.perf_counter()
+        self.settings = load_settings()
+        self.integrations = create_integrations(self.settings)
+        for platform in self.integrations["publisher"].platforms:
+            if not platform.warm_up():
+                print(f"Warm-up failed for {platform.name}; it will be retried on the next run.")
+        get_model()
+        if self.settings["IMAGE_GENERATION_ENABLED"]:
+            load_image_pipeline()
+        self.startup_seconds = IMPORT_SECONDS + time.perf_counter() - start
+        print(f"Daemon warm in {self.startup_seconds:.1f}s, RSS {current_rss_mb():.0f} MB.")
+
+    def next_run_time(self, now):
+        """
+        Compute the next scheduled run after `now`.
+
+        Parameters:
+        - now (datetime): Current time.
+
+        Returns:
+        - datetime: Time of the next run.
+        """
+        candidates = []
+        if self.interval:
+            candidates.append((self.last_trigger or now) + self.interval)
+        for at in self.daily_at:
+            candidate = datetime.combine(now.date(), at)
+            if candidate <= now:
+                candidate += timedelta(days=1)
+            candidates.append(candidate)
+        return min(candidates)
+
+    def trigger(self):
+        """
+        Start a run in the background unless one is already in progress.
+
+        Returns:
+        - bool: True if a run was started, False if it was skipped.
+        """
+        self.last_trigger = datetime.now()
+        if not self._run_lock.acquire(blocking=False):
+            print("Previous run still in progress; skipping this trigger.")
+            return False
+        if not self.file_lock.acquire():
+            self._run_lock.release()
+            print(f"Another process holds '{self.file_lock.path}'; skipping this trigger.")
+            return False
+        self.started_runs += 1
+        self._run_thread = threading.Thread(target=self._run, name="pipeline-run", daemon=True)
+        self._run_thread.start()
+        return True
+
+    def serve(self):
+        """
+        Block and run the pipeline on schedule until stopped or `max_runs` is reached.
+        """
+        if self.integrations is None:
+            self.warm_up()
+        if self.run_on_start:
+            self.trigger()
+        while not self._stop.is_set() and not self._reached_max_runs():
+            next_run = self.next_run_time(datetime.now())
+            print(f"Next run scheduled at {next_run:%Y-%m-%d %H:%M:%S}.")
+            while not self._stop.is_set() and datetime.now() < next_run:
+                self._stop.wait(min((next_run - datetime.now()).total_seconds(), 30))
+            if not self._stop.is_set():
+                self.trigger()
+        self.shutdown()
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def shutdown(self):
+        """
+        Wait for the current run and release the warm clients.
+        """
+        if self._run_thread is not None:
+            self._run_thread.join()
+        if self.integrations is not None:
+            self.integrations["publisher"].close()
+            self.integrations["telegram"].close()
+        self.print_summary()
+
+    def print_summary(self):
+        cold = [run for run in self.runs if run["kind"] == "cold"]
+        warm = [run for run in self.runs if run["kind"] == "warm"]
+        means = {}
+        for kind, runs in (("cold", cold), ("warm", warm)):
+            if runs:
+                means[kind] = sum(run["seconds"] for run in runs) / len(runs)
+                rss = sum(run["rss_mb"] for run in runs) / len(runs)
+                print(f"{kind} runs: {len(runs)}, mean {means[kind]:.1f}s, mean RSS {rss:.0f} MB")
+        if self.startup_seconds is not None:
+            print(f"Startup cost paid once instead of per run: {self.startup_seconds:.1f}s")
+        if "cold" in means and "warm" in means:
+            print(
+                f"Warm runs vs cold baseline: {means['warm']:.1f}s vs {means['cold']:.1f}s "
+                f"({means['cold'] / max(means['warm'], 1e-9):.2f}x)."
+            )
+
+    def _reached_max_runs(self):
+        return self.max_runs is not None and self.started_runs >= self.max_runs
+
+    def _run(self):
+        # The first run plus startup is what a cron invocation costs: the cold baseline.
+        kind = "cold" if not self.runs else "warm"
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        ok = True
+        run_id = None
+        try:
+            run_id = run_traced(self.integrations, self.settings)
+        except Exception as e:
+            ok = False
+            print(f"Pipeline run failed: {e}")
+        finally:
+            run_seconds = time.perf_counter() - start
+            startup = (self.startup_seconds or 0) if kind == "cold" else 0
+            stats = {
+                "run_id": run_id,
+                "kind": kind,
+                "ok": ok,
+                "started_at": self.last_trigger.isoformat(timespec="seconds"),
+                "seconds": run_seconds + startup,
+                "run_seconds": run_seconds,
+                "rss_before_mb": rss_before,
+                "rss_mb": current_rss_mb(),
+                "peak_rss_mb": peak_rss_mb(),
+                "startup_seconds": self.startup_seconds,
+            }
+            self.runs.append(stats)
+            self._write_stats(stats)
+            print(
+                f"Run {len(self.runs)} ({kind}): {stats['seconds']:.1f}s"
+                + (f" including {startup:.1f}s startup" if startup else "")
+                + f", RSS {stats['rss_mb']:.0f} MB (peak {stats['peak_rss_mb']:.0f} MB)"
+            )
+            self.file_lock.release()
+            self._run_lock.release()
+
+    def _write_stats(self, stats):
+        directory = os.path.dirname(self.stats_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.stats_path, "a") as f:
+            f.write(json.dumps(stats) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the blog pipeline as a resident daemon on a schedule.")
+    parser.add_argument("--interval", type=float, default=float(os.environ.get("DAEMON_INTERVAL_MINUTES", 0)) or None,
+                        help="Run every N minutes.")
+    parser.add_argument("--at", action="append", default=None,
+                        help="Daily run time as HH:MM; repeat for several times a day.")
+    parser.add_argument("--run-now", action="store_true", help="Run once as soon as the daemon is warm.")
+    parser.add_argument("--max-runs", type=int, default=None, help="Exit after N runs.")
+    parser.add_argument("--lock", default="auto_blog_studio.lock", help="Lock file guarding against overlapping runs.")
+    parser.add_argument("--stats", default="metrics/daemon_runs.jsonl", help="Per-run latency and memory log.")
+    args = parser.parse_args()
+
+    daemon = BlogDaemon(
+        interval_minutes=args.interval,
+        daily_at=args.at,
+        lock_path=args.lock,
+        stats_path=args.stats,
+        run_on_start=args.run_now,
+        max_runs=args.max_runs,
+    )
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.serve()
@@ -1,9 +1,35 @@
 import feedparser
+import requests
 from bs4 import BeautifulSoup
 import json
+import os
 import time
 import random
 from datetime import datetime
+from urllib.parse import urljoin
+from instrumentation import tracer
+from llm import llama
+
+# Source locations; overridable so the crawler can be pointed at local fixtures.
+TDS_FEED_URL = os.environ.get("TDS_FEED_URL", "https://towardsdatascience.com/feed")
+KDNUGGETS_URL = os.environ.get("KDNUGGETS_URL", "https://www.kdnuggets.com/")
+DEVTO_URL = os.environ.get("DEVTO_URL", "https://dev.to/t/ai/latest")
+NVIDIA_BLOG_URL = os.environ.get("NVIDIA_BLOG_URL", "https://developer.nvidia.com/blog/recent-posts/")
+# Base politeness delay in seconds between article requests (randomised up to 2x).
+CRAWL_DELAY = float(os.environ.get("CRAWL_DELAY", "1"))
+
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+# Reused across requests so connections to each site stay open between pages and runs.
+_session = requests.Session()
+
+def fetch_page(url, headers=None, source=None):
+    """Fetch a page, recording a trace span and the bytes downloaded."""
+    with tracer.span("fetch", source=source, url=url) as span:
+        response = _session.get(url, headers=headers)
+        span.set("status", response.status_code)
+        tracer.count("bytes", len(response.content), source=source)
+    return response
 
 def fetch_rss_feed(url):
     """Fetch and filter RSS feed data from Towards Data Science."""
@@ -11,7 +37,8 @@ def fetch_rss_feed(url):
     restricted_phrases = ["Continue reading on Towards Data Science", "source=rss"]
     
     try:
-        feed = feedparser.parse(url)
+        response = fetch_page(url, headers={'User-Agent': 'Mozilla/5.0'}, source="Towards Data Science")
+        feed = feedparser.parse(response.content)
         for entry in feed.entries[:20]:  # Limit to latest 20 entries
             if not any(phrase in entry.summary for phrase in restricted_phrases):
                 summary_soup = BeautifulSoup(entry.summary, "html.parser")
@@ -26,117 +53,129 @@ def fetch_rss_feed(url):
         print(f"Error fetching RSS feed: {e}")
     return articles
 
-def fetch_kdnuggets_articles():
-    """Fetch articles from KDNuggets."""
-    base_url = "https://www.kdnuggets.com/"
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    articles = []
-
+def list_kdnuggets_articles():
+    """Collect article titles and links from the KDNuggets homepage."""
+    base_url = KDNUGGETS_URL
+    stubs = []
     try:
-        response = requests.get(base_url, headers=headers)
+        response = fetch_page(base_url, headers=HEADERS, source="KDNuggets")
         if response.status_code == 200:
             soup = BeautifulSoup(response.content, 'html.parser')
             for a_tag in soup.find_all('a'):
                 b_tag = a_tag.find('b')
                 if b_tag:
-                    title = b_tag.get_text(strip=True)
                     link = a_tag.get('href')
                     if link and not link.startswith('http'):
-                        link = base_url + link
-                    
-                    try:
-                        page_response = requests.get(link, headers=headers)
-                        page_soup = BeautifulSoup(page_response.content, 'html.parser')
-                        post_div = page_soup.find('div', id='post-')
-                        content = post_div.get_text(strip=True) if post_div else "Content not found"
-                        
-                        articles.append({
-                            'title': title,
-                            'link': link,
-                            'content': content
-                        })
-                    except Exception as e:
-                        print(f"Error fetching KDNuggets article at {link}: {e}")
-                    time.sleep(1 + random.uniform(0, 1))
+                        link = urljoin(base_url, link)
+                    stubs.append({'title': b_tag.get_text(strip=True), 'link': link})
     except Exception as e:
         print(f"Error fetching KDNuggets homepage: {e}")
-    
-    return articles
+    return stubs
 
-def fetch_devto_articles():
-    """Fetch articles from Dev.to."""
-    url = "https://dev.to/t/ai/latest"
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    articles = []
+def fetch_kdnuggets_article(stub):
+    """Fetch the content of a KDNuggets article."""
+    page_response = fetch_page(stub['link'], headers=HEADERS, source="KDNuggets")
+    page_soup = BeautifulSoup(page_response.content, 'html.parser')
+    post_div = page_soup.find('div', id='post-')
+    return post_div.get_text(strip=True) if post_div else "Content not found"
+
+def fetch_kdnuggets_articles():
+    """Fetch articles from KDNuggets."""
+    return fetch_source_articles("KDNuggets", list_kdnuggets_articles())
 
+def list_devto_articles():
+    """Collect article titles and links from the Dev.to listing."""
+    url = DEVTO_URL
+    stubs = []
     try:
-        response = requests.get(url, headers=headers)
+        response = fetch_page(url, headers=HEADERS, source="Dev.to")
         soup = BeautifulSoup(response.content, "html.parser")
-        
         for article in soup.find_all("div", class_="crayons-story"):
             title_tag = article.find("h2", class_="crayons-story__title")
             link_tag = title_tag.find("a") if title_tag else None
-            
             if title_tag and link_tag:
-                title = title_tag.get_text(strip=True)
-                link = f"https://dev.to{link_tag['href']}"
-                
-                try:
-                    article_response = requests.get(link, headers=headers)
-                    article_soup = BeautifulSoup(article_response.content, "html.parser")
-                    content_div = article_soup.find("div", class_="crayons-article__body text-styles spec__body")
-                    content = content_div.get_text(strip=True) if content_div else "Content not found"
-                    
-                    articles.append({
-                        'title': title,
-                        'link': link,
-                        'content': content
-                    })
-                except Exception as e:
-                    print(f"Error fetching Dev.to article at {link}: {e}")
-                
-                time.sleep(1 + random.uniform(0, 1))
+                stubs.append({'title': title_tag.get_text(strip=True), 'link': urljoin(url, link_tag['href'])})
     except Exception as e:
         print(f"Error fetching Dev.to homepage: {e}")
+    return stubs
 
-    return articles
+def fetch_devto_article(stub):
+    """Fetch the content of a Dev.to article."""
+    article_response = fetch_page(stub['link'], headers=HEADERS, source="Dev.to")
+    article_soup = BeautifulSoup(article_response.content, "html.parser")
+    content_div = article_soup.find("div", class_="crayons-article__body text-styles spec__body")
+    return content_div.get_text(strip=True) if content_div else "Content not found"
 
-def fetch_nvidia_blog_articles():
-    """Fetch articles from NVIDIA blog."""
-    url = "https://developer.nvidia.com/blog/recent-posts/"
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    articles = []
+def fetch_devto_articles():
+    """Fetch articles from Dev.to."""
+    return fetch_source_articles("Dev.to", list_devto_articles())
 
+def list_nvidia_blog_articles():
+    """Collect article titles and links from the NVIDIA blog listing."""
+    url = NVIDIA_BLOG_URL
+    stubs = []
     try:
-        response = requests.get(url, headers=headers)
+        response = fetch_page(url, headers=HEADERS, source="NVIDIA Blog")
         if response.status_code == 200:
             soup = BeautifulSoup(response.content, 'html.parser')
             for link_tag in soup.find_all('a', class_='carousel-row-slide__link'):
                 title_span = link_tag.find('span', class_='visually-hidden')
                 if title_span:
-                    title = title_span.get_text(strip=True)
                     link = link_tag['href']
                     if not link.startswith('http'):
-                        link = 'https://developer.nvidia.com' + link
-                    
-                    try:
-                        post_response = requests.get(link, headers=headers)
-                        post_soup = BeautifulSoup(post_response.content, 'html.parser')
-                        content_div = post_soup.find('div', class_='entry-content')
-                        content = content_div.get_text(separator="\n", strip=True) if content_div else "Content not found"
-                        
-                        articles.append({
-                            'title': title,
-                            'link': link,
-                            'content': content
-                        })
-                    except Exception as e:
-                        print(f"Error fetching NVIDIA article at {link}: {e}")
-                    
-                    time.sleep(1 + random.uniform(0, 1))
+                        link = urljoin(url, link)
+                    stubs.append({'title': title_span.get_text(strip=True), 'link': link})
     except Exception as e:
         print(f"Error fetching NVIDIA homepage: {e}")
+    return stubs
+
+def fetch_nvidia_blog_article(stub):
+    """Fetch the content of an NVIDIA blog post."""
+    post_response = fetch_page(stub['link'], headers=HEADERS, source="NVIDIA Blog")
+    post_soup = BeautifulSoup(post_response.content, 'html.parser')
+    content_div = post_soup.find('div', class_='entry-content')
+    return content_div.get_text(separator="\n", strip=True) if content_div else "Content not found"
+
+def fetch_nvidia_blog_articles():
+    """Fetch articles from NVIDIA blog."""
+    return fetch_source_articles("NVIDIA Blog", list_nvidia_blog_articles())
+
+# Each source has an index step returning article stubs ({'title', 'link'}) and a page step
+# returning an article's content. Sources whose index already carries the content (RSS) have
+# no page step. Keeping the two apart lets article pages be crawled by different workers.
+SOURCES = {
+    "Towards Data Science": (lambda: fetch_rss_feed(TDS_FEED_URL), None),
+    "KDNuggets": (list_kdnuggets_articles, fetch_kdnuggets_article),
+    "Dev.to": (list_devto_articles, fetch_devto_article),
+    "NVIDIA Blog": (list_nvidia_blog_articles, fetch_nvidia_blog_article),
+}
+
+def list_source_articles(source):
+    """Run the index step of a source; see SOURCES."""
+    list_articles, _ = SOURCES[source]
+    return list_articles()
+
+def fetch_source_articles(source, stubs):
+    """
+    Run the page step of a source for some of its article stubs.
 
+    Parameters:
+    - source (str): Name of the source in SOURCES.
+    - stubs (list): Stubs from list_source_articles().
+
+    Returns:
+    - list: Articles with 'title', 'link' and 'content'; stubs whose page failed are skipped.
+    """
+    _, fetch_article = SOURCES[source]
+    if fetch_article is None:
+        return stubs
+    articles = []
+    for stub in stubs:
+        try:
+            articles.append({'title': stub['title'], 'link': stub['link'], 'content': fetch_article(stub)})
+        except Exception as e:
+            print(f"Error fetching {source} article at {stub['link']}: {e}")
+        time.sleep(CRAWL_DELAY * (1 + random.uniform(0, 1)))
     return articles
 
 def save_articles_to_json(data):
@@ -155,13 +194,59 @@ def save_articles_to_json(data):
 
 def gather_and_save_articles():
     """Fetch articles from multiple sources and save them to a JSON file."""
-    all_articles = {
-        "Towards Data Science": fetch_rss_feed("https://towardsdatascience.com/feed"),
-        "KDNuggets": fetch_kdnuggets_articles(),
-        "Dev.to": fetch_devto_articles(),
-        "NVIDIA Blog": fetch_nvidia_blog_articles()
-    }
+    all_articles = {}
+    for source in SOURCES:
+        with tracer.span("crawl", source=source):
+            all_articles[source] = fetch_source_articles(source, list_source_articles(source))
+        tracer.count("articles", len(all_articles[source]), source=source)
     return save_articles_to_json(all_articles)
 
+def extract_topics(data):
+    """
+    Extract the main topic of every article with the LLM.
+
+    Parameters:
+    - data (dict): Articles data keyed by publication.
+
+    Returns:
+    - data (dict): The same data with a "main_topic" field added to each article.
+    """
+    for publication, articles in data.items():
+        for article in articles:
+            extract_topic(article)
+    return data
+
+def extract_topic(article):
+    """
+    Set the "main_topic" field of a single article.
+
+    Parameters:
+    - article (dict): Article with a "content" field. Articles without content are left unchanged.
+
+    Returns:
+    - article (dict): The same article.
+    """
+    system_message = "Extract the main topic or keyword from the following article content and summarize it in one sentence."
+    content = article.get("content", "")
+    if not content:
+        return article
+    truncated_content = content[:500]
+    prompt = (
+        "<|begin_of_text|>"
+        "<|start_header_id|>system<|end_header_id|>"
+        f"{system_message}"
+        "<|eot_id|>"
+        "<|start_header_id|>user<|end_header_id|>"
+        f"{truncated_content}...."
+        "<|eot_id|>"
+        "<|start_header_id|>assistant<|end_header_id|>"
+    )
+    try:
+        article["main_topic"] = llama(prompt, max_tokens=4096, temperature=0.3).strip()
+    except Exception as e:
+        print(f"Error extracting topic from '{article.get('title', '')}': {e}")
+        article["main_topic"] = "Error in extraction"
+    return article
+
 if __name__ == "__main__":
     gather_and_save_articles()
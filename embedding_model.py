@@ -1,9 +1,18 @@
 from sentence_transformers import SentenceTransformer
 from sklearn.cluster import KMeans
 import numpy as np
+from instrumentation import tracer
 
-# Load the SentenceTransformer model
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# The SentenceTransformer model, loaded on first use and kept for later runs
+model = None
+
+def get_model():
+    """Load the SentenceTransformer model once and return it."""
+    global model
+    if model is None:
+        with tracer.span("embedding_model_load"):
+            model = SentenceTransformer('all-MiniLM-L6-v2')
+    return model
 
 def generate_embeddings(data):
     """
@@ -16,16 +25,34 @@ def generate_embeddings(data):
     - embeddings (list): List of generated embeddings.
     - topics (list): Corresponding main topics.
     """
+    embeddings, topics, _ = generate_article_embeddings(data)
+    return embeddings, topics
+
+def generate_article_embeddings(data):
+    """
+    Generate embeddings for the main topics in the data, keeping track of their articles.
+
+    Parameters:
+    - data (dict): Articles data with main topics.
+
+    Returns:
+    - embeddings (list): List of generated embeddings.
+    - topics (list): Corresponding main topics.
+    - articles (list): (publication, article) for each embedding.
+    """
     embeddings = []
     topics = []
+    embedded_articles = []
     for publication, articles in data.items():
         for article in articles:
             main_topic = article.get("main_topic")
             if main_topic and "Error" not in main_topic:
-                embedding = model.encode(main_topic)
+                with tracer.span("encode", source=publication):
+                    embedding = get_model().encode(main_topic)
                 embeddings.append(embedding)
                 topics.append(main_topic)
-    return embeddings, topics
+                embedded_articles.append((publication, article))
+    return embeddings, topics, embedded_articles
 
 def cluster_topics(embeddings, topics, num_clusters=3):
     """
@@ -43,8 +70,9 @@ def cluster_topics(embeddings, topics, num_clusters=3):
         print("No embeddings provided for clustering.")
         return {}
 
-    kmeans = KMeans(n_clusters=num_clusters, random_state=0)
-    labels = kmeans.fit_predict(embeddings)
+    with tracer.span("cluster", num_clusters=num_clusters, num_embeddings=len(embeddings)):
+        kmeans = KMeans(n_clusters=num_clusters, random_state=0)
+        labels = kmeans.fit_predict(embeddings)
 
     clustered_topics = {i: [] for i in range(num_clusters)}
     for idx, label in enumerate(labels):
@@ -52,12 +80,19 @@ def cluster_topics(embeddings, topics, num_clusters=3):
 
     return clustered_topics
 
-def rank_topics(clustered_topics):
+def rank_topics(clustered_topics, trend_scores=None, trend_groups=None, n=5):
     """
-    Rank topics based on a simulated relevance score.
+    Rank topics by trend score, or by a simulated relevance score without one.
+
+    Each option is a different topic: repeated topic texts are ranked once, and only
+    the best topic of each trend group is picked before any group is used twice.
 
     Parameters:
     - clustered_topics (dict): Topics organized by cluster labels.
+    - trend_scores (dict): Score of each topic, e.g. from TrendEngine.scores().
+    - trend_groups (dict): (group, similarity) of each topic, e.g. the tracked trend it was
+      counted for and its similarity to that trend; ties in score go to the most similar topic.
+    - n (int): Number of topics to return.
 
     Returns:
     - top_topics (list): List of top-ranked topics.
@@ -67,12 +102,27 @@ def rank_topics(clustered_topics):
     topic_scores = []
     for cluster, topic_list in clustered_topics.items():
         for topic in topic_list:
-            relevance_score = random.uniform(0, 1)  # Simulate a relevance score
-            topic_scores.append((topic, relevance_score))
+            if trend_scores is not None:
+                relevance_score = float(trend_scores.get(topic, 0.0))
+            else:
+                relevance_score = random.uniform(0, 1)  # Simulate a relevance score
+            group, similarity = (trend_groups or {}).get(topic, (None, 0.0))
+            topic_scores.append((topic, relevance_score, group, similarity))
 
     # Sort by relevance score in descending order
-    topic_scores = sorted(topic_scores, key=lambda x: x[1], reverse=True)
-    return topic_scores[:5]  # Top 5 topics
+    topic_scores = sorted(topic_scores, key=lambda x: (x[1], x[3]), reverse=True)
+    top_topics, picked, groups = [], set(), set()
+    # First one topic per trend group, then fill up with the best remaining topics.
+    for one_per_group in (True, False):
+        for topic, relevance_score, group, _ in topic_scores:
+            if len(top_topics) == n:
+                return top_topics
+            if topic in picked or (one_per_group and group is not None and group in groups):
+                continue
+            picked.add(topic)
+            groups.add(group)
+            top_topics.append((topic, relevance_score))
+    return top_topics
 
 if __name__ == "__main__":
     # Example usage
@@ -0,0 +1,625 @@
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+import urllib.request
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+from xml.sax.saxutils import escape
+
+FIXTURE_TOPICS = [
+    "Large language models for code generation",
+    "Retrieval-augmented generation in production",
+    "GPU acceleration for deep learning training",
+    "Data engineering pipelines with Python",
+    "Computer vision for medical imaging",
+    "Reinforcement learning for robotics",
+    "MLOps and model monitoring",
+    "Vector databases and semantic search",
+]
+
+LOREM_WORDS = (
+    "model data training inference pipeline feature vector accuracy latency deployment "
+    "dataset transformer embedding gradient optimization evaluation benchmark cluster"
+).split()
+
+
+def _words(count, seed):
+    return " ".join(LOREM_WORDS[(seed + i * 7) % len(LOREM_WORDS)] for i in range(count))
+
+
+class _QuietServer(ThreadingHTTPServer):
+    """Ignores clients that disconnect mid-request (e.g. terminated worker nodes)."""
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeService:
+    """
+    A local HTTP stand-in for an external service.
+
+    Subclasses implement `handle(method, path, query, headers, body)` and return
+    `(status, headers, body)`. Every request waits `latency` seconds first to
+    emulate the network round trip of the real service.
+    """
+
+    name = "service"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.request_count = 0
+        self.server = None
+        self.thread = None
+        self.url = None
+        self._count_lock = threading.Lock()
+
+    def start(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without TCP_NODELAY, keep-alive clients
+            # would see a delayed-ACK stall of ~40 ms on every response.
+            disable_nagle_algorithm = True
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                parts = urlsplit(self.path)
+                with service._count_lock:
+                    service.request_count += 1
+                if service.latency:
+                    time.sleep(service.latency)
+                status, headers, payload = service.handle(
+                    self.command, unquote(parts.path), parse_qs(parts.query, keep_blank_values=True), self.headers, body
+                )
+                if isinstance(payload, (dict, list)):
+                    payload = json.dumps(payload).encode("utf-8")
+                    headers = {"Content-Type": "application/json", **headers}
+                elif isinstance(payload, str):
+                    payload = payload.encode("utf-8")
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if "Content-Length" not in headers:
+                    self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = _QuietServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, name=f"fake-{self.name}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def reset(self):
+        self.request_count = 0
+
+    def handle(self, method, path, query, headers, body):
+        raise NotImplementedError
+
+
+class FakeNewsSites(FakeService):
+    """Serves HTML/RSS fixtures shaped like the four crawled sources."""
+
+    name = "news"
+
+    def __init__(self, articles_per_source=10, words_per_article=400, latency=0.0):
+        super().__init__(latency)
+        self.articles_per_source = articles_per_source
+        self.words_per_article = words_per_article
+
+    def env(self):
+        return {
+            "TDS_FEED_URL": f"{self.url}/tds/feed",
+            "KDNUGGETS_URL": f"{self.url}/kdnuggets/",
+            "DEVTO_URL": f"{self.url}/devto/t/ai/latest",
+            "NVIDIA_BLOG_URL": f"{self.url}/nvidia/blog/recent-posts/",
+        }
+
+    def _article(self, source, idx):
+        seed = zlib.crc32(f"{source}-{idx}".encode())
+        topic = FIXTURE_TOPICS[seed % len(FIXTURE_TOPICS)]
+        return f"{topic} ({source} #{idx})", f"{topic}. {_words(self.words_per_article, seed)}"
+
+    def handle(self, method, path, query, headers, body):
+        html = {"Content-Type": "text/html; charset=utf-8"}
+        n = range(self.articles_per_source)
+
+        if path == "/tds/feed":
+            items = []
+            for idx in n:
+                title, content = self._article("tds", idx)
+                items.append(
+                    f"<item><title>{escape(title)}</title><link>{self.url}/tds/post-{idx}</link>"
+                    f"<description>{escape(f'<p>{content}</p>')}</description></item>"
+                )
+            rss = (
+                '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                f"<title>Towards Data Science</title>{''.join(items)}</channel></rss>"
+            )
+            return 200, {"Content-Type": "application/rss+xml"}, rss
+
+        if path == "/kdnuggets/":
+            links = "".join(f'<a href="/kdnuggets/post-{idx}"><b>{self._article("kdn", idx)[0]}</b></a>' for idx in n)
+            return 200, html, f"<html><body>{links}</body></html>"
+        match = re.fullmatch(r"/kdnuggets/post-(\d+)", path)
+        if match:
+            return 200, html, f'<html><body><div id="post-">{self._article("kdn", int(match.group(1)))[1]}</div></body></html>'
+
+        if path == "/devto/t/ai/latest":
+            stories = "".join(
+                f'<div class="crayons-story"><h2 class="crayons-story__title">'
+                f'<a href="/devto/post-{idx}">{self._article("devto", idx)[0]}</a></h2></div>'
+                for idx in n
+            )
+            return 200, html, f"<html><body>{stories}</body></html>"
+        match = re.fullmatch(r"/devto/post-(\d+)", path)
+        if match:
+            content = self._article("devto", int(match.group(1)))[1]
+            return 200, html, f'<html><body><div class="crayons-article__body text-styles spec__body">{content}</div></body></html>'
+
+        if path == "/nvidia/blog/recent-posts/":
+            slides = "".join(
+                f'<a class="carousel-row-slide__link" href="/nvidia/blog/post-{idx}">'
+                f'<span class="visually-hidden">{self._article("nvidia", idx)[0]}</span></a>'
+                for idx in n
+            )
+            return 200, html, f"<html><body>{slides}</body></html>"
+        match = re.fullmatch(r"/nvidia/blog/post-(\d+)", path)
+        if match:
+            content = self._article("nvidia", int(match.group(1)))[1]
+            return 200, html, f'<html><body><div class="entry-content">{content}</div></body></html>'
+
+        return 404, html, "<html><body>Not found</body></html>"
+
+
+class FakeLLM(FakeService):
+    """
+    Ollama-compatible completions/chat endpoints with configurable latency.
+
+    `tokens_per_second` adds generation time proportional to the response length
+    on top of the fixed per-request `latency`.
+    """
+
+    name = "llm"
+
+    def __init__(self, latency=0.05, tokens_per_second=None):
+        super().__init__(latency)
+        self.tokens_per_second = tokens_per_second
+
+    def env(self):
+        return {"OLLAMA_BASE_URL": self.url}
+
+    def _respond(self, prompt, max_tokens):
+        seed = zlib.crc32(prompt.encode())
+        if "Extract the main topic" in prompt:
+            return FIXTURE_TOPICS[zlib.crc32(prompt.split("<|start_header_id|>user<|end_header_id|>")[-1][:60].encode()) % len(FIXTURE_TOPICS)]
+        if "SEO-friendly title" in prompt:
+            return "A Practical Guide to " + FIXTURE_TOPICS[seed % len(FIXTURE_TOPICS)]
+        if "tags" in prompt:
+            return "AI, Machine Learning, Data Science, Python, Deep Learning"
+        if "image" in prompt:
+            return "A bright modern office with engineers reviewing charts on large monitors, natural light, realistic textures"
+        words = min(max_tokens, 900)
+        paragraphs = "".join(f"<p>{_words(words // 6, seed + i)}</p>" for i in range(6))
+        return f"<h1>{FIXTURE_TOPICS[seed % len(FIXTURE_TOPICS)]}</h1>{paragraphs}"
+
+    def handle(self, method, path, query, headers, body):
+        payload = json.loads(body or b"{}")
+        if path == "/v1/completions":
+            prompt = payload.get("prompt", "")
+        elif path == "/v1/chat/completions":
+            prompt = "\n".join(message.get("content", "") for message in payload.get("messages", []))
+        else:
+            return 404, {}, {"error": "not found"}
+
+        text = self._respond(prompt, payload.get("max_tokens", 256))
+        completion_tokens = len(text.split())
+        if self.tokens_per_second:
+            time.sleep(completion_tokens / self.tokens_per_second)
+        usage = {"prompt_tokens": len(prompt.split()), "completion_tokens": completion_tokens}
+        if path == "/v1/completions":
+            return 200, {}, {"choices": [{"text": text}], "usage": usage}
+        return 200, {}, {"choices": [{"message": {"role": "assistant", "content": text}}], "usage": usage}
+
+
+class FakeTelegram(FakeService):
+    """
+    Telegram Bot API stand-in. When inline options are sent, a button press for
+    `selected_option` becomes available `selection_delay` seconds later.
+    """
+
+    name = "telegram"
+
+    def __init__(self, selection_delay=0.5, selected_option="Topic 1", latency=0.0, messages_per_second=None):
+        super().__init__(latency)
+        self.selection_delay = selection_delay
+        self.selected_option = selected_option
+        # When set, sendMessage answers 429 with retry_after beyond this rate, like the real API.
+        self.messages_per_second = messages_per_second
+        self._condition = threading.Condition()
+        self.reset()
+
+    def env(self):
+        return {"TELEGRAM_API_URL": self.url, "TELEGRAM_BOT_TOKEN": "fake-token", "TELEGRAM_CHAT_ID": "1"}
+
+    def reset(self):
+        super().reset()
+        with self._condition:
+            self.messages = []
+            self.updates = []
+            self.next_update_id = 1
+            self.method_counts = {}
+            self.send_times = []
+            self.webhook = None
+
+    def _queue_selection(self):
+        with self._condition:
+            update = {
+                "update_id": self.next_update_id,
+                "callback_query": {"id": str(self.next_update_id), "data": self.selected_option},
+            }
+            self.next_update_id += 1
+            if self.webhook:
+                # Pushed to the bot's webhook instead of being kept for getUpdates.
+                threading.Timer(self.selection_delay, self._deliver, args=(dict(self.webhook), update)).start()
+                return
+            self.updates.append({"due": time.time() + self.selection_delay, "update": update})
+            self._condition.notify_all()
+
+    def _deliver(self, webhook, update):
+        request = urllib.request.Request(
+            webhook["url"],
+            data=json.dumps(update).encode("utf-8"),
+            headers={"Content-Type": "application/json", "X-Telegram-Bot-Api-Secret-Token": webhook.get("secret_token") or ""},
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).read()
+        except OSError as e:
+            print(f"Fake Telegram could not deliver to webhook: {e}")
+
+    def _ready_updates(self, offset):
+        now = time.time()
+        ready = [entry["update"] for entry in self.updates if entry["due"] <= now]
+        if offset < 0:
+            return ready[offset:]
+        return [update for update in ready if update["update_id"] >= offset]
+
+    def handle(self, method, path, query, headers, body):
+        api_method = path.rsplit("/", 1)[-1]
+        params = {key: values[-1] for key, values in query.items()}
+        if body:
+            params.update(json.loads(body))
+        with self._condition:
+            self.method_counts[api_method] = self.method_counts.get(api_method, 0) + 1
+
+        if api_method == "sendMessage":
+            with self._condition:
+                now = time.time()
+                self.send_times = [t for t in self.send_times if now - t < 1.0]
+                if self.messages_per_second and len(self.send_times) >= self.messages_per_second:
+                    self.method_counts["rate_limited"] = self.method_counts.get("rate_limited", 0) + 1
+                    return 429, {}, {"ok": False, "error_code": 429, "parameters": {"retry_after": 1}}
+                self.send_times.append(now)
+                self.messages.append(params.get("text", ""))
+            if "reply_markup" in params:
+                self._queue_selection()
+            return 200, {}, {"ok": True, "result": {"message_id": len(self.messages)}}
+
+        if api_method == "setWebhook":
+            with self._condition:
+                self.webhook = {"url": params["url"], "secret_token": params.get("secret_token")}
+                if params.get("drop_pending_updates"):
+                    self.updates = []
+            return 200, {}, {"ok": True, "result": True}
+
+        if api_method == "deleteWebhook":
+            with self._condition:
+                self.webhook = None
+            return 200, {}, {"ok": True, "result": True}
+
+        if api_method == "getUpdates":
+            if self.webhook:
+                return 409, {}, {"ok": False, "description": "Conflict: can't use getUpdates method while webhook is active"}
+            offset = int(params.get("offset") or 0)
+            deadline = time.time() + float(params.get("timeout") or 0)
+            with self._condition:
+                # Updates below the offset are confirmed and dropped, like the real API.
+                if offset > 0:
+                    self.updates = [entry for entry in self.updates if entry["update"]["update_id"] >= offset]
+                ready = self._ready_updates(offset)
+                while not ready and time.time() < deadline:
+                    pending = [entry["due"] for entry in self.updates]
+                    wake_at = min(pending + [deadline])
+                    self._condition.wait(max(wake_at - time.time(), 0.001))
+                    ready = self._ready_updates(offset)
+            return 200, {}, {"ok": True, "result": ready}
+
+        return 200, {}, {"ok": True, "result": True}
+
+
+class FakeMedium(FakeService):
+    name = "medium"
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency)
+        self.posts = []
+
+    def env(self):
+        return {"MEDIUM_API_URL": f"{self.url}/v1", "MEDIUM_INTEGRATION_TOKEN": "fake-token"}
+
+    def reset(self):
+        super().reset()
+        self.posts = []
+
+    def handle(self, method, path, query, headers, body):
+        if path == "/v1/me":
+            return 200, {}, {"data": {"id": "fake-user"}}
+        match = re.fullmatch(r"/v1/users/([^/]+)/posts", path)
+        if match and method == "POST":
+            self.posts.append(json.loads(body))
+            return 201, {}, {"data": {"id": str(len(self.posts)), "url": f"{self.url}/p/{len(self.posts)}"}}
+        return 404, {}, {"errors": [{"message": "not found"}]}
+
+
+class FakeBlogger(FakeService):
+    """Serves both the Google OAuth token endpoint and the Blogger v3 posts API."""
+
+    name = "blogger"
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency)
+        self.posts = []
+
+    def env(self):
+        return {
+            "GOOGLE_TOKEN_URI": f"{self.url}/token",
+            "BLOGGER_API_ENDPOINT": f"{self.url}/",
+            "GOOGLE_CLIENT_ID": "fake-client",
+            "GOOGLE_CLIENT_SECRET": "fake-secret",
+            "GOOGLE_REFRESH_TOKEN": "fake-refresh",
+            "BLOGGER_BLOG_ID": "1",
+        }
+
+    def reset(self):
+        super().reset()
+        self.posts = []
+
+    def handle(self, method, path, query, headers, body):
+        if path == "/token":
+            return 200, {}, {"access_token": f"fake-access-{time.time()}", "expires_in": 3600, "token_type": "Bearer"}
+        match = re.fullmatch(r"(?:/blogger)?/v3/blogs/([^/]+)/posts/?", path)
+        if match and method == "POST":
+            self.posts.append(json.loads(body))
+            return 200, {}, {"id": str(len(self.posts)), "url": f"{self.url}/post/{len(self.posts)}"}
+        return 404, {}, {"error": {"code": 404, "message": "not found"}}
+
+
+class FakeS3(FakeService):
+    """
+    Path-style S3 stand-in supporting object PUT/GET/HEAD/DELETE, ListObjectsV2,
+    multipart uploads, Range requests, conditional reads and writes (If-Match /
+    If-None-Match) and user metadata.
+    """
+
+    name = "s3"
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency)
+        self.objects = {}
+        self.uploads = {}
+        self._lock = threading.Lock()
+        self._upload_ids = 0
+
+    def env(self):
+        return {
+            "S3_ENDPOINT_URL": self.url,
+            "S3_BUCKET_NAME": "fake-bucket",
+            "AWS_ACCESS_KEY_ID": "fake",
+            "AWS_SECRET_ACCESS_KEY": "fake",
+            "AWS_REGION_NAME": "us-east-1",
+        }
+
+    def reset(self):
+        super().reset()
+        with self._lock:
+            self.objects = {}
+            self.uploads = {}
+
+    def _error(self, status, code):
+        return status, {"Content-Type": "application/xml"}, f"<Error><Code>{code}</Code></Error>"
+
+    def _store(self, bucket, key, body, etag, headers):
+        self.objects[(bucket, key)] = {
+            "body": body,
+            "etag": etag,
+            "modified": time.time(),
+            "content_type": headers.get("Content-Type") or "application/octet-stream",
+            "cache_control": headers.get("Cache-Control"),
+            "metadata": {name.lower(): value for name, value in headers.items() if name.lower().startswith("x-amz-meta-")},
+        }
+
+    def handle(self, method, path, query, headers, body):
+        bucket, _, key = path.lstrip("/").partition("/")
+        if not key:
+            if method == "GET":
+                return self._list(bucket, query)
+            return 200, {}, b""
+        if "uploads" in query or "uploadId" in query:
+            return self._multipart(method, bucket, key, query, headers, body)
+
+        with self._lock:
+            if method == "PUT":
+                # Conditional writes: create-only (If-None-Match: *) and compare-and-swap (If-Match).
+                existing = self.objects.get((bucket, key))
+                if headers.get("If-None-Match") == "*" and existing is not None:
+                    return self._error(412, "PreconditionFailed")
+                if headers.get("If-Match") and (existing is None or existing["etag"] != headers["If-Match"]):
+                    return self._error(412, "PreconditionFailed")
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                self._store(bucket, key, body, etag, headers)
+                return 200, {"ETag": etag}, b""
+            if method == "DELETE":
+                self.objects.pop((bucket, key), None)
+                return 204, {}, b""
+            obj = self.objects.get((bucket, key))
+
+        if obj is None:
+            return self._error(404, "NoSuchKey")
+        if headers.get("If-Match") and headers["If-Match"] != obj["etag"]:
+            return self._error(412, "PreconditionFailed")
+        if headers.get("If-None-Match") and headers["If-None-Match"] == obj["etag"]:
+            return 304, {"ETag": obj["etag"]}, b""
+        headers_out = {
+            "ETag": obj["etag"],
+            "Last-Modified": formatdate(obj["modified"], usegmt=True),
+            "Content-Type": obj["content_type"],
+            "Content-Length": str(len(obj["body"])),
+            "Accept-Ranges": "bytes",
+            **obj["metadata"],
+        }
+        if obj["cache_control"]:
+            headers_out["Cache-Control"] = obj["cache_control"]
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", headers.get("Range") or "")
+        if match and method == "GET":
+            size = len(obj["body"])
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+            if start >= size:
+                return self._error(416, "InvalidRange")
+            headers_out["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers_out["Content-Length"] = str(end - start + 1)
+            return 206, headers_out, obj["body"][start:end + 1]
+        return 200, headers_out, obj["body"]
+
+    def _multipart(self, method, bucket, key, query, headers, body):
+        with self._lock:
+            if method == "POST" and "uploads" in query:
+                self._upload_ids += 1
+                upload_id = f"upload-{self._upload_ids}"
+                self.uploads[upload_id] = {"bucket": bucket, "key": key, "headers": headers, "parts": {}}
+                xml = (
+                    '<?xml version="1.0" encoding="UTF-8"?><InitiateMultipartUploadResult>'
+                    f"<Bucket>{bucket}</Bucket><Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId>"
+                    "</InitiateMultipartUploadResult>"
+                )
+                return 200, {"Content-Type": "application/xml"}, xml
+
+            upload = self.uploads.get(query["uploadId"][-1])
+            if upload is None:
+                return self._error(404, "NoSuchUpload")
+            if method == "PUT":
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                upload["parts"][int(query["partNumber"][-1])] = (body, etag)
+                return 200, {"ETag": etag}, b""
+            if method == "DELETE":
+                del self.uploads[query["uploadId"][-1]]
+                return 204, {}, b""
+
+            # CompleteMultipartUpload: assemble the listed parts in order.
+            numbers = [int(n) for n in re.findall(r"<PartNumber>(\d+)</PartNumber>", body.decode("utf-8"))]
+            if any(number not in upload["parts"] for number in numbers):
+                return self._error(400, "InvalidPart")
+            data = b"".join(upload["parts"][number][0] for number in numbers)
+            digest = hashlib.md5(b"".join(bytes.fromhex(upload["parts"][n][1].strip('"')) for n in numbers)).hexdigest()
+            etag = f'"{digest}-{len(numbers)}"'
+            self._store(bucket, key, data, etag, upload["headers"])
+            del self.uploads[query["uploadId"][-1]]
+        xml = (
+            '<?xml version="1.0" encoding="UTF-8"?><CompleteMultipartUploadResult>'
+            f"<Bucket>{bucket}</Bucket><Key>{escape(key)}</Key><ETag>{escape(etag)}</ETag>"
+            "</CompleteMultipartUploadResult>"
+        )
+        return 200, {"Content-Type": "application/xml"}, xml
+
+    def _list(self, bucket, query):
+        prefix = query.get("prefix", [""])[-1]
+        with self._lock:
+            keys = sorted(key for (b, key) in self.objects if b == bucket and key.startswith(prefix))
+            contents = "".join(
+                f"<Contents><Key>{escape(key)}</Key><ETag>{escape(self.objects[(bucket, key)]['etag'])}</ETag>"
+                f"<Size>{len(self.objects[(bucket, key)]['body'])}</Size></Contents>"
+                for key in keys
+            )
+        xml = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"<Name>{bucket}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(keys)}</KeyCount>"
+            f"<IsTruncated>false</IsTruncated>{contents}</ListBucketResult>"
+        )
+        return 200, {"Content-Type": "application/xml"}, xml
+
+
+class FakeServices:
+    """Starts every stand-in together and provides the environment for main.py."""
+
+    def __init__(self, articles_per_source=10, source_latency=0.0, llm_latency=0.05, tokens_per_second=None,
+                 api_latency=0.0, selection_delay=0.5):
+        self.news = FakeNewsSites(articles_per_source=articles_per_source, latency=source_latency)
+        self.llm = FakeLLM(latency=llm_latency, tokens_per_second=tokens_per_second)
+        self.telegram = FakeTelegram(selection_delay=selection_delay, latency=api_latency)
+        self.medium = FakeMedium(latency=api_latency)
+        self.blogger = FakeBlogger(latency=api_latency)
+        self.s3 = FakeS3(latency=api_latency)
+        self.services = [self.news, self.llm, self.telegram, self.medium, self.blogger, self.s3]
+
+    def start(self):
+        for service in self.services:
+            service.start()
+        return self
+
+    def stop(self):
+        for service in self.services:
+            service.stop()
+
+    def reset(self):
+        for service in self.services:
+            service.reset()
+
+    def env(self):
+        env = {}
+        for service in self.services:
+            env.update(service.env())
+        return env
+
+    def request_counts(self):
+        return {service.name: service.request_count for service in self.services}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+
+if __name__ == "__main__":
+    with FakeServices() as services:
+        for key, value in sorted(services.env().items()):
+            print(f"{key}={value}")
+        print("Fake services running. Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,166 @@
+import hashlib
+import html
+import io
+import re
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from instrumentation import tracer
+
+IMAGE_WIDTHS = (1200, 768, 480)
+IMAGE_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+# Keys are content hashes, so an object never changes once uploaded.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def create_image_variants(image, widths=IMAGE_WIDTHS, formats=("webp", "jpeg"), key_prefix="images/"):
+    """
+    Encode resized WebP and JPEG variants of an image.
+
+    Widths larger than the source are skipped rather than upscaled; the source width
+    is always included.
+
+    Parameters:
+    - image (PIL.Image.Image): The source image.
+    - widths (tuple): Target widths in pixels.
+    - formats (tuple): Output formats, keys of IMAGE_FORMATS.
+    - key_prefix (str): Prefix of the S3 keys.
+
+    Returns:
+    - list: Dicts with "key", "format", "content_type", "width", "height" and "data",
+      where the key is derived from a hash of the encoded bytes.
+    """
+    image = image.convert("RGB")
+    targets = sorted({min(width, image.width) for width in widths}, reverse=True)
+    variants = []
+    with tracer.span("image_encode", variants=len(targets) * len(formats)):
+        for width in targets:
+            height = round(image.height * width / image.width)
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for name in formats:
+                pil_format, content_type, options = IMAGE_FORMATS[name]
+                buffer = io.BytesIO()
+                resized.save(buffer, format=pil_format, **options)
+                data = buffer.getvalue()
+                digest = hashlib.sha256(data).hexdigest()[:20]
+                variants.append({
+                    "key": f"{key_prefix}{digest}-{width}w.{'jpg' if name == 'jpeg' else name}",
+                    "format": name,
+                    "content_type": content_type,
+                    "width": width,
+                    "height": height,
+                    "data": data,
+                })
+    return variants
+
+def upload_image_variants(s3_manager, variants, max_workers=4):
+    """
+    Upload image variants to S3 concurrently, skipping objects that already exist.
+
+    Parameters:
+    - s3_manager (S3Manager): Destination bucket.
+    - variants (list): Variants from create_image_variants().
+    - max_workers (int): Parallel transfers.
+
+    Returns:
+    - list: The variants that are now in S3, each with a "url" and an "uploaded" flag
+      (False when the object was already present). Variants that failed to upload are dropped.
+    """
+    def upload(variant):
+        if s3_manager.object_exists(variant["key"]):
+            return {**variant, "url": s3_manager.object_url(variant["key"]), "uploaded": False}
+        if not s3_manager.upload_bytes(variant["key"], variant["data"], content_type=variant["content_type"],
+                                       cache_control=IMMUTABLE_CACHE_CONTROL):
+            return None
+        tracer.count("image_upload_bytes", len(variant["data"]), format=variant["format"])
+        return {**variant, "url": s3_manager.object_url(variant["key"]), "uploaded": True}
+
+    if not variants:
+        return []
+    with tracer.span("image_upload", variants=len(variants)):
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(variants))) as executor:
+            results = list(executor.map(upload, variants))
+    return [result for result in results if result is not None]
+
+def image_html(variants, alt, sizes="(max-width: 768px) 100vw, 768px"):
+    """
+    Build a responsive <picture> element for uploaded variants.
+
+    WebP is offered as a <source>; the <img> falls back to JPEG so platforms that strip
+    <picture> or do not accept WebP still show the image.
+
+    Parameters:
+    - variants (list): Uploaded variants from upload_image_variants().
+    - alt (str): Alternative text.
+    - sizes (str): The sizes attribute for the srcset.
+
+    Returns:
+    - str: The HTML, or an empty string if there is no JPEG or WebP variant to show.
+    """
+    by_format = {}
+    for variant in sorted(variants, key=lambda v: v["width"]):
+        by_format.setdefault(variant["format"], []).append(variant)
+    fallback_variants = by_format.get("jpeg") or by_format.get("webp")
+    if not fallback_variants:
+        return ""
+
+    def srcset(items):
+        return ", ".join(f"{html.escape(item['url'])} {item['width']}w" for item in items)
+
+    # Use the variant closest to 768px as the default src.
+    fallback = min(fallback_variants, key=lambda v: abs(v["width"] - 768))
+    parts = ["<figure><picture>"]
+    if "webp" in by_format and fallback["format"] != "webp":
+        parts.append(f'<source type="image/webp" srcset="{srcset(by_format["webp"])}" sizes="{sizes}">')
+    parts.append(
+        f'<img src="{html.escape(fallback["url"])}" srcset="{srcset(fallback_variants)}" sizes="{sizes}" '
+        f'width="{fallback["width"]}" height="{fallback["height"]}" alt="{html.escape(alt)}" loading="lazy">'
+    )
+    parts.append("</picture></figure>")
+    return "".join(parts)
+
+def insert_image(content, variants, alt):
+    """
+    Insert the image into post HTML, after the first heading or at the top.
+
+    Parameters:
+    - content (str): HTML content of the post.
+    - variants (list): Uploaded variants from upload_image_variants().
+    - alt (str): Alternative text.
+
+    Returns:
+    - str: The HTML content with the image inserted.
+    """
+    figure = image_html(variants, alt)
+    if not figure:
+        return content
+    match = re.search(r"</h[12]>", content, flags=re.IGNORECASE)
+    if match:
+        return content[:match.end()] + "\n" + figure + content[match.end():]
+    return figure + "\n" + content
+
+def publish_image_assets(s3_manager, image, content, alt, key_prefix="images/", max_workers=4):
+    """
+    Encode, upload and insert the post image.
+
+    Parameters:
+    - s3_manager (S3Manager): Destination bucket.
+    - image (PIL.Image.Image): The generated image.
+    - content (str): HTML content of the post.
+    - alt (str): Alternative text.
+    - key_prefix (str): Prefix of the S3 keys.
+    - max_workers (int): Parallel transfers.
+
+    Returns:
+    - tuple: (content, uploaded) — the HTML with the image inserted (unchanged if nothing
+      could be uploaded) and the uploaded variants.
+    """
+    variants = create_image_variants(image, key_prefix=key_prefix)
+    uploaded = upload_image_variants(s3_manager, variants, max_workers=max_workers)
+    return insert_image(content, uploaded, alt), uploaded
+
+if __name__ == "__main__":
+    image = Image.new("RGB", (768, 512), (40, 90, 160))
+    for variant in create_image_variants(image):
+        print(f"{variant['key']}: {variant['width']}x{variant['height']}, {len(variant['data']) / 1024:.1f} KB")
@@ -0,0 +1,50 @@
+import threading
+from instrumentation import tracer
+
+STABLE_DIFFUSION_MODEL_ID = "CompVis/stable-diffusion-v1-4"
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def load_image_pipeline(model_id=STABLE_DIFFUSION_MODEL_ID, device="cuda"):
+    """
+    Load the Stable Diffusion pipeline once and keep it resident for later runs.
+
+    Parameters:
+    - model_id (str): Hugging Face model ID.
+    - device (str): Torch device to move the pipeline to.
+
+    Returns:
+    - StableDiffusionPipeline: The loaded pipeline.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            from diffusers import StableDiffusionPipeline
+            import torch
+
+            with tracer.span("image_model_load", model=model_id):
+                pipe = StableDiffusionPipeline.from_pretrained(model_id, torch_dtype=torch.float16)
+                _pipeline = pipe.to(device)
+    return _pipeline
+
+def generate_blog_image(image_prompt, width=768, height=512):
+    """
+    Generate an image for the blog post.
+
+    Parameters:
+    - image_prompt (str): Prompt describing the image.
+    - width (int): Image width in pixels.
+    - height (int): Image height in pixels.
+
+    Returns:
+    - PIL.Image.Image: The generated image.
+    """
+    pipe = load_image_pipeline()
+    with tracer.span("image_generation", model=STABLE_DIFFUSION_MODEL_ID, width=width, height=height):
+        return pipe(prompt=image_prompt, height=height, width=width).images[0]
+
+if __name__ == "__main__":
+    image = generate_blog_image("A bright modern office with engineers reviewing charts on large monitors")
+    image.save("generated_image.png")
+    print("Image saved to 'generated_image.png'.")
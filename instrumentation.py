@@ -0,0 +1,268 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+
+class _NullSpan:
+    """Span returned while tracing is disabled; every operation is a no-op."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set(self, key, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = None
+        self.start_time = None
+        self.duration = None
+        self.thread = None
+        self._start = None
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        self.parent_id = stack[-1].span_id if stack else None
+        stack.append(self)
+        self.thread = threading.current_thread().name
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self._start
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc_value}"
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        self.tracer._record(self)
+        return False
+
+    def set(self, key, value):
+        """
+        Attach an attribute to the span, e.g. a status code or a result size.
+        """
+        self.attributes[key] = value
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_seconds": self.duration,
+            "thread": self.thread,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    def __init__(self, enabled=False, metric_prefix="autoblog"):
+        """
+        Initialize the Tracer.
+
+        Parameters:
+        - enabled (bool): Whether spans and counters are recorded.
+        - metric_prefix (str): Prefix for exported Prometheus metric names.
+        """
+        self.enabled = enabled
+        self.metric_prefix = metric_prefix
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """
+        Drop all recorded spans and counters and start a new run ID.
+        """
+        with self._lock:
+            self.run_id = _new_run_id()
+            self.spans = []
+            self.counters = {}
+
+    def span(self, name, **attributes):
+        """
+        Time a block of work.
+
+        Usage:
+            with tracer.span("fetch", source="KDNuggets") as span:
+                ...
+                span.set("status", 200)
+
+        Parameters:
+        - name (str): Stage name, e.g. "fetch", "encode", "llm".
+        - attributes: Extra details recorded in the JSON trace.
+
+        Returns:
+        - Span: A context manager; a shared no-op span when disabled.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, attributes)
+
+    def count(self, name, value=1, **labels):
+        """
+        Increment a counter, e.g. `tracer.count("bytes", 5120, source="Dev.to")`.
+
+        Parameters:
+        - name (str): Counter name.
+        - value (int|float): Amount to add.
+        - labels: Label values distinguishing series of the same counter.
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def stage_summary(self):
+        """
+        Aggregate recorded spans by name.
+
+        Returns:
+        - dict: Stage name -> {"count", "total_seconds", "max_seconds", "errors"}.
+        """
+        summary = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stage = summary.setdefault(span.name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "errors": 0})
+            stage["count"] += 1
+            stage["total_seconds"] += span.duration
+            stage["max_seconds"] = max(stage["max_seconds"], span.duration)
+            if "error" in span.attributes:
+                stage["errors"] += 1
+        return summary
+
+    def export_prometheus(self, path):
+        """
+        Write stage timings and counters in the Prometheus text exposition
+        format, e.g. for the node_exporter textfile collector.
+
+        Parameters:
+        - path (str): Destination file. Written atomically.
+
+        Returns:
+        - str: The path written.
+        """
+        prefix = self.metric_prefix
+        lines = [
+            f"# HELP {prefix}_stage_duration_seconds Time spent per pipeline stage.",
+            f"# TYPE {prefix}_stage_duration_seconds summary",
+        ]
+        for stage, stats in sorted(self.stage_summary().items()):
+            labels = _format_labels({"stage": stage})
+            lines.append(f"{prefix}_stage_duration_seconds_sum{labels} {stats['total_seconds']:.6f}")
+            lines.append(f"{prefix}_stage_duration_seconds_count{labels} {stats['count']}")
+
+        with self._lock:
+            counters = dict(self.counters)
+        for name in sorted({key[0] for key in counters}):
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(f"{metric}{_format_labels(dict(labels))} {value}")
+
+        lines.append(f"# TYPE {prefix}_last_run_timestamp_seconds gauge")
+        lines.append(f"{prefix}_last_run_timestamp_seconds {time.time():.3f}")
+        _write_atomic(path, "\n".join(lines) + "\n")
+        return path
+
+    def export_json_trace(self, path):
+        """
+        Write every recorded span and counter of the current run as JSON.
+
+        Parameters:
+        - path (str): Destination file.
+
+        Returns:
+        - str: The path written.
+        """
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self.counters.items()
+            ]
+        trace = {
+            "run_id": self.run_id,
+            "stages": self.stage_summary(),
+            "spans": spans,
+            "counters": counters,
+        }
+        _write_atomic(path, json.dumps(trace, indent=4))
+        return path
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+
+def _new_run_id():
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# Process-wide tracer used by every pipeline module. Disabled until enabled by main().
+tracer = Tracer(enabled=False)
+
+
+if __name__ == "__main__":
+    tracer.enable()
+    with tracer.span("fetch", source="Example"):
+        time.sleep(0.05)
+        tracer.count("bytes", 2048, source="Example")
+        tracer.count("articles", 3, source="Example")
+    with tracer.span("llm", model="example") as span:
+        time.sleep(0.02)
+        span.set("completion_tokens", 42)
+        tracer.count("tokens", 42, kind="completion")
+
+    print(open(tracer.export_prometheus("metrics/example.prom")).read())
+    print(f"Trace written to {tracer.export_json_trace('traces/example.json')}")
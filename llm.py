@@ -0,0 +1,79 @@
+import os
+import requests
+import json
+from instrumentation import tracer
+
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.2:3b")
+
+# Reused across calls so connections to the Ollama server stay open.
+_session = requests.Session()
+
+def llama(prompt_or_messages, temperature, max_tokens, raw=False, debug=False):
+    """
+    Query the local Ollama server through its OpenAI-compatible API.
+
+    Parameters:
+    - prompt_or_messages (str|dict|list): A raw prompt for the completions endpoint,
+      or a chat message (or list of messages) for the chat endpoint.
+    - temperature (float): Sampling temperature.
+    - max_tokens (int): Maximum number of tokens to generate.
+    - raw (bool): Return the full response JSON instead of the text.
+    - debug (bool): Print the request payload.
+
+    Returns:
+    - str: The generated text (or the response JSON if raw is True).
+    """
+    if isinstance(prompt_or_messages, str):
+        endpoint = "completions"
+        payload = {
+            "model": OLLAMA_MODEL,
+            "temperature": temperature,
+            "prompt": prompt_or_messages,
+            "max_tokens": max_tokens
+        }
+    else:
+        endpoint = "chat/completions"
+        messages = prompt_or_messages if isinstance(prompt_or_messages, list) else [prompt_or_messages]
+        payload = {
+            "model": OLLAMA_MODEL,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stop": ["<|eot_id|>", "<|eom_id|>"],
+            "messages": messages
+        }
+
+    if debug:
+        print("Payload:", payload)
+
+    headers = {
+        "Accept": "application/json",
+        "Content-Type": "application/json"
+    }
+
+    with tracer.span("llm", endpoint=endpoint, model=OLLAMA_MODEL, max_tokens=max_tokens) as span:
+        try:
+            response = _session.post(f"{OLLAMA_BASE_URL}/v1/{endpoint}", headers=headers, data=json.dumps(payload))
+            response.raise_for_status()
+            res = response.json()
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Request failed: {e}")
+
+        if 'error' in res:
+            raise Exception(f"API Error: {res['error']}")
+
+        usage = res.get("usage", {})
+        span.set("prompt_tokens", usage.get("prompt_tokens", 0))
+        span.set("completion_tokens", usage.get("completion_tokens", 0))
+        tracer.count("tokens", usage.get("prompt_tokens", 0), kind="prompt")
+        tracer.count("tokens", usage.get("completion_tokens", 0), kind="completion")
+
+    if raw:
+        return res
+
+    if endpoint == "completions":
+        return res['choices'][0].get('text', '')
+    return res['choices'][0].get('message', {}).get('content', '')
+
+if __name__ == "__main__":
+    print(llama({"role": "user", "content": "Say hello in five words."}, temperature=0.7, max_tokens=20))
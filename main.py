@@ -1,6 +1,8 @@
 import json
-from data_preparation import gather_and_save_articles
-from embedding_model import generate_embeddings, cluster_topics, rank_topics
+import os
+from contextlib import nullcontext
+from data_preparation import gather_and_save_articles, extract_topics, save_articles_to_json
+from embedding_model import generate_article_embeddings, cluster_topics, rank_topics
 from blog_generation import (
     generate_blog_with_references,
     generate_title,
@@ -11,49 +13,245 @@ from telegram_integration import TelegramBot
 from s3_manager import S3Manager
 from medium_integration import MediumIntegration
 from blogger_integration import BloggerIntegration
+from image_generation import generate_blog_image
+from image_assets import publish_image_assets
+from publisher import Publisher, MediumPlatform, BloggerPlatform
+from outbox import PublishingOutbox
+from coordination import WorkQueue, ClusterRun
+from trends import TrendEngine
+from speculation import SpeculativeDrafter
+from instrumentation import tracer
 
-def main():
-    # Configuration for each service
-    TELEGRAM_BOT_TOKEN = "your_telegram_bot_token_here"
-    TELEGRAM_CHAT_ID = "your_chat_id_here"
-
-    AWS_ACCESS_KEY_ID = "your_aws_access_key_id_here"
-    AWS_SECRET_ACCESS_KEY = "your_aws_secret_access_key_here"
-    AWS_REGION_NAME = "your_aws_region_here"
-    S3_BUCKET_NAME = "your_bucket_name_here"
-    S3_TOKEN_PATH = "refresh_token.txt"
-
-    MEDIUM_INTEGRATION_TOKEN = "your_medium_integration_token_here"
-
-    GOOGLE_CLIENT_ID = "your_google_client_id_here"
-    GOOGLE_CLIENT_SECRET = "your_google_client_secret_here"
-    GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
-    GOOGLE_REFRESH_TOKEN = "your_google_refresh_token_here"
-    BLOGGER_BLOG_ID = "your_blogger_blog_id_here"
-
-    # Initialize integrations
-    telegram = TelegramBot(bot_token=TELEGRAM_BOT_TOKEN, chat_id=TELEGRAM_CHAT_ID)
-    s3_manager = S3Manager(
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        region_name=AWS_REGION_NAME,
-        bucket_name=S3_BUCKET_NAME,
+# Outbox workers per platform; the Blogger client gives each thread its own transport.
+PLATFORM_CONCURRENCY = {"Medium": 1, "Blogger": 2}
+
+def load_settings():
+    """
+    Read the configuration for each service. Environment variables override the placeholders.
+
+    Returns:
+    - dict: Settings keyed by name.
+    """
+    env = os.environ.get
+    return {
+        "TELEGRAM_BOT_TOKEN": env("TELEGRAM_BOT_TOKEN", "your_telegram_bot_token_here"),
+        "TELEGRAM_CHAT_ID": env("TELEGRAM_CHAT_ID", "your_chat_id_here"),
+        "TELEGRAM_API_URL": env("TELEGRAM_API_URL", "https://api.telegram.org"),
+        "TELEGRAM_POLL_TIMEOUT": int(env("TELEGRAM_POLL_TIMEOUT", "30")),
+        # Status messages sent within this many seconds are merged and delivered in the background.
+        "TELEGRAM_COALESCE_WINDOW": float(env("TELEGRAM_COALESCE_WINDOW", "0.5")),
+        # Optional webhook mode: public HTTPS URL, local "host:port" to listen on and secret token.
+        "TELEGRAM_WEBHOOK_URL": env("TELEGRAM_WEBHOOK_URL"),
+        "TELEGRAM_WEBHOOK_LISTEN": env("TELEGRAM_WEBHOOK_LISTEN", "0.0.0.0:8443"),
+        "TELEGRAM_WEBHOOK_SECRET": env("TELEGRAM_WEBHOOK_SECRET"),
+
+        "AWS_ACCESS_KEY_ID": env("AWS_ACCESS_KEY_ID", "your_aws_access_key_id_here"),
+        "AWS_SECRET_ACCESS_KEY": env("AWS_SECRET_ACCESS_KEY", "your_aws_secret_access_key_here"),
+        "AWS_REGION_NAME": env("AWS_REGION_NAME", "your_aws_region_here"),
+        "S3_BUCKET_NAME": env("S3_BUCKET_NAME", "your_bucket_name_here"),
+        "S3_ENDPOINT_URL": env("S3_ENDPOINT_URL"),
+        "S3_TOKEN_PATH": "refresh_token.txt",
+        # Base URL the bucket's public objects are served from (e.g. a CDN); defaults to the bucket URL.
+        "S3_PUBLIC_BASE_URL": env("S3_PUBLIC_BASE_URL"),
+        # Local read-through cache for artifacts downloaded from S3, validated by ETag.
+        "S3_CACHE_DIR": env("S3_CACHE_DIR", "s3_cache"),
+
+        "MEDIUM_INTEGRATION_TOKEN": env("MEDIUM_INTEGRATION_TOKEN", "your_medium_integration_token_here"),
+        "MEDIUM_API_URL": env("MEDIUM_API_URL", "https://api.medium.com/v1"),
+
+        "GOOGLE_CLIENT_ID": env("GOOGLE_CLIENT_ID", "your_google_client_id_here"),
+        "GOOGLE_CLIENT_SECRET": env("GOOGLE_CLIENT_SECRET", "your_google_client_secret_here"),
+        "GOOGLE_TOKEN_URI": env("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token"),
+        "GOOGLE_REFRESH_TOKEN": env("GOOGLE_REFRESH_TOKEN", "your_google_refresh_token_here"),
+        "BLOGGER_BLOG_ID": env("BLOGGER_BLOG_ID", "your_blogger_blog_id_here"),
+        "BLOGGER_API_ENDPOINT": env("BLOGGER_API_ENDPOINT"),
+        "BLOGGER_TOKEN_PATH": env("BLOGGER_TOKEN_PATH", "blogger_access_token.json"),
+
+        "OUTBOX_PATH": env("OUTBOX_PATH", "outbox.db"),
+
+        # Share crawling, topic extraction and post generation with `coordination.py` worker nodes.
+        "CLUSTER_ENABLED": env("CLUSTER_ENABLED", "0") == "1",
+        "CLUSTER_PREFIX": env("CLUSTER_PREFIX", "cluster/"),
+        "CLUSTER_LEASE_SECONDS": float(env("CLUSTER_LEASE_SECONDS", "60")),
+        "CLUSTER_POLL_INTERVAL": float(env("CLUSTER_POLL_INTERVAL", "0.5")),
+        "CLUSTER_BATCH_SIZE": int(env("CLUSTER_BATCH_SIZE", "4")),
+
+        # Rolling per-source topic volume used to rank topics by momentum across runs.
+        "TREND_STATE_PATH": env("TREND_STATE_PATH", "trends.npz"),
+        "TREND_BUCKET_HOURS": float(env("TREND_BUCKET_HOURS", "24")),
+        "TREND_WINDOW": int(env("TREND_WINDOW", "28")),
+
+        # Draft posts for this many top-ranked topics while waiting for the selection (0 disables).
+        "SPECULATION_CANDIDATES": int(env("SPECULATION_CANDIDATES", "0")),
+        "SPECULATION_CONCURRENCY": int(env("SPECULATION_CONCURRENCY", "2")),
+        # Comma-separated option numbers (1-based) to draft first, e.g. "2,1"; empty means rank order.
+        "SPECULATION_PRIORITY": [int(n) - 1 for n in env("SPECULATION_PRIORITY", "").split(",") if n.strip()],
+        "SPECULATION_STATS_PATH": env("SPECULATION_STATS_PATH", "metrics/speculation.jsonl"),
+
+        "IMAGE_GENERATION_ENABLED": env("IMAGE_GENERATION_ENABLED", "1") == "1",
+        "IMAGE_KEY_PREFIX": env("IMAGE_KEY_PREFIX", "images/"),
+
+        "TRACING_ENABLED": env("TRACING_ENABLED", "1") == "1",
+        "PROMETHEUS_METRICS_PATH": env("PROMETHEUS_METRICS_PATH", "metrics/auto_blog_studio.prom"),
+        "TRACE_DIR": env("TRACE_DIR", "traces"),
+    }
+
+def create_integrations(settings):
+    """
+    Initialize every service client.
+
+    Parameters:
+    - settings (dict): Settings from load_settings().
+
+    Returns:
+    - dict: Clients keyed by "telegram", "s3_manager", "medium", "blogger", "publisher", "outbox",
+      "work_queue" (None unless CLUSTER_ENABLED) and "trends".
+    """
+    webhook_host, webhook_port = settings["TELEGRAM_WEBHOOK_LISTEN"].rsplit(":", 1)
+    telegram = TelegramBot(
+        bot_token=settings["TELEGRAM_BOT_TOKEN"],
+        chat_id=settings["TELEGRAM_CHAT_ID"],
+        api_url=settings["TELEGRAM_API_URL"],
+        poll_timeout=settings["TELEGRAM_POLL_TIMEOUT"],
+        webhook_url=settings["TELEGRAM_WEBHOOK_URL"],
+        webhook_listen=(webhook_host, int(webhook_port)),
+        webhook_secret=settings["TELEGRAM_WEBHOOK_SECRET"],
+        coalesce_window=settings["TELEGRAM_COALESCE_WINDOW"],
+    )
+    if telegram.webhook is not None and not telegram.start_webhook():
+        print("Falling back to long-polling getUpdates.")
+        telegram.stop_webhook()
+        telegram.webhook = None
+    s3_manager = create_s3_manager(settings)
+    medium, blogger, publisher = create_publisher(settings, s3_manager)
+    return {
+        "telegram": telegram,
+        "s3_manager": s3_manager,
+        "medium": medium,
+        "blogger": blogger,
+        "publisher": publisher,
+        "outbox": PublishingOutbox(path=settings["OUTBOX_PATH"], platform_concurrency=PLATFORM_CONCURRENCY),
+        "work_queue": WorkQueue(
+            s3_manager,
+            prefix=settings["CLUSTER_PREFIX"],
+            lease_seconds=settings["CLUSTER_LEASE_SECONDS"],
+            poll_interval=settings["CLUSTER_POLL_INTERVAL"],
+        ) if settings["CLUSTER_ENABLED"] else None,
+        "trends": TrendEngine(
+            path=settings["TREND_STATE_PATH"],
+            bucket_seconds=int(settings["TREND_BUCKET_HOURS"] * 3600),
+            window=settings["TREND_WINDOW"],
+        ),
+    }
+
+def create_s3_manager(settings):
+    """
+    Initialize the S3 client.
+
+    Parameters:
+    - settings (dict): Settings from load_settings().
+
+    Returns:
+    - S3Manager: The client for S3_BUCKET_NAME.
+    """
+    return S3Manager(
+        aws_access_key_id=settings["AWS_ACCESS_KEY_ID"],
+        aws_secret_access_key=settings["AWS_SECRET_ACCESS_KEY"],
+        region_name=settings["AWS_REGION_NAME"],
+        bucket_name=settings["S3_BUCKET_NAME"],
+        endpoint_url=settings["S3_ENDPOINT_URL"],
+        public_base_url=settings["S3_PUBLIC_BASE_URL"],
+        cache_dir=settings["S3_CACHE_DIR"],
     )
-    medium = MediumIntegration(integration_token=MEDIUM_INTEGRATION_TOKEN)
+
+def create_publisher(settings, s3_manager):
+    """
+    Initialize only the publishing clients, e.g. for draining the outbox next to a running daemon.
+
+    Parameters:
+    - settings (dict): Settings from load_settings().
+    - s3_manager (S3Manager): Bucket through which Blogger access tokens are shared.
+
+    Returns:
+    - tuple: (MediumIntegration, BloggerIntegration, Publisher).
+    """
+    medium = MediumIntegration(integration_token=settings["MEDIUM_INTEGRATION_TOKEN"], base_url=settings["MEDIUM_API_URL"])
     blogger = BloggerIntegration(
-        client_id=GOOGLE_CLIENT_ID,
-        client_secret=GOOGLE_CLIENT_SECRET,
+        client_id=settings["GOOGLE_CLIENT_ID"],
+        client_secret=settings["GOOGLE_CLIENT_SECRET"],
         scopes=["https://www.googleapis.com/auth/blogger"],
-        token_uri=GOOGLE_TOKEN_URI,
-        refresh_token=GOOGLE_REFRESH_TOKEN,
-        blog_id=BLOGGER_BLOG_ID,
+        token_uri=settings["GOOGLE_TOKEN_URI"],
+        refresh_token=settings["GOOGLE_REFRESH_TOKEN"],
+        blog_id=settings["BLOGGER_BLOG_ID"],
+        api_endpoint=settings["BLOGGER_API_ENDPOINT"],
+        s3_manager=s3_manager,
+        token_path=settings["BLOGGER_TOKEN_PATH"],
     )
+    return medium, blogger, Publisher([MediumPlatform(medium), BloggerPlatform(blogger)])
+
+def run_traced(integrations, settings):
+    """
+    Run the pipeline once, exporting its trace and metrics when tracing is enabled.
+
+    Parameters:
+    - integrations (dict): Clients from create_integrations().
+    - settings (dict): Settings from load_settings().
+
+    Returns:
+    - str: The run ID of the trace.
+    """
+    if settings["TRACING_ENABLED"]:
+        tracer.enable()
+        tracer.reset()
+    cluster = None
+    if integrations.get("work_queue") is not None:
+        # A fresh ID per run: the trace ID is only reset when tracing is enabled, and a reused
+        # ID would hand this run the previous run's task results.
+        cluster = ClusterRun(integrations["work_queue"], batch_size=settings["CLUSTER_BATCH_SIZE"])
+    try:
+        with tracer.span("run"), cluster or nullcontext():
+            run_pipeline(
+                integrations["telegram"],
+                integrations["publisher"],
+                integrations["outbox"],
+                s3_manager=integrations["s3_manager"],
+                generate_image=settings["IMAGE_GENERATION_ENABLED"],
+                image_key_prefix=settings["IMAGE_KEY_PREFIX"],
+                cluster=cluster,
+                trends=integrations.get("trends"),
+                speculation={
+                    "candidates": settings["SPECULATION_CANDIDATES"],
+                    "concurrency": settings["SPECULATION_CONCURRENCY"],
+                    "priority": settings["SPECULATION_PRIORITY"] or None,
+                    "stats_path": settings["SPECULATION_STATS_PATH"],
+                } if settings["SPECULATION_CANDIDATES"] > 0 else None,
+            )
+    finally:
+        if settings["TRACING_ENABLED"]:
+            tracer.export_prometheus(settings["PROMETHEUS_METRICS_PATH"])
+            trace_path = tracer.export_json_trace(os.path.join(settings["TRACE_DIR"], f"{tracer.run_id}.json"))
+            print(f"Run trace written to '{trace_path}'.")
+    return tracer.run_id
+
+def main():
+    settings = load_settings()
+    integrations = create_integrations(settings)
+    try:
+        run_traced(integrations, settings)
+    finally:
+        integrations["publisher"].close()
+        integrations["telegram"].close()
 
-    # Step 1: Gather articles and save them
-    telegram.send_message("Starting the blog generation process... 📝")
-    saved_file_path = gather_and_save_articles()
+def run_pipeline(telegram, publisher, outbox, s3_manager=None, generate_image=True, image_key_prefix="images/",
+                 cluster=None, trends=None, speculation=None):
+    # Step 1: Gather articles and save them (split across worker nodes when running as a cluster)
+    telegram.notify("Starting the blog generation process... 📝")
+    if cluster is not None:
+        saved_file_path = save_articles_to_json(cluster.gather_articles())
+    else:
+        saved_file_path = gather_and_save_articles()
     if not saved_file_path:
-        telegram.send_message("Failed to gather articles. Exiting process.")
+        telegram.notify("Failed to gather articles. Exiting process.")
         return
 
     # Step 2: Load saved articles
@@ -61,80 +259,133 @@ def main():
         with open(saved_file_path, "r") as f:
             data = json.load(f)
     except Exception as e:
-        telegram.send_message(f"Error loading articles: {e}")
+        telegram.notify(f"Error loading articles: {e}")
         return
 
-    telegram.send_message("Articles gathered successfully! 📑")
+    telegram.notify("Articles gathered successfully! 📑")
+
+    # Extract the main topic of each article for clustering
+    with tracer.span("topic_extraction"):
+        data = cluster.extract_topics(data) if cluster is not None else extract_topics(data)
 
     # Step 3: Generate embeddings and cluster topics
-    embeddings, topics = generate_embeddings(data)
+    embeddings, topics, embedded_articles = generate_article_embeddings(data)
     if not embeddings:
-        telegram.send_message("No embeddings generated. Exiting process.")
+        telegram.notify("No embeddings generated. Exiting process.")
         return
 
     clustered_topics = cluster_topics(embeddings, topics)
-    top_topics = rank_topics(clustered_topics)
+
+    # Rank by momentum: count only articles not seen in earlier runs, then score their topics
+    trend_scores = trend_groups = None
+    if trends is not None:
+        assignments = trends.update(
+            embeddings,
+            [publication for publication, _ in embedded_articles],
+            [article.get("link") or article.get("title") for _, article in embedded_articles],
+            topics,
+        )
+        trends.save()
+        scores = trends.scores()
+        similarities = trends.similarity(embeddings, assignments)
+        trend_scores, trend_groups = {}, {}
+        for topic, index, similarity in zip(topics, assignments, similarities):
+            # Articles of one trend share its score; keep each text's closest match.
+            if topic not in trend_groups or similarity > trend_groups[topic][1]:
+                trend_scores[topic] = float(scores[index])
+                trend_groups[topic] = (int(index), float(similarity))
+    top_topics = rank_topics(clustered_topics, trend_scores, trend_groups)
 
     # Step 4: Send top topics to Telegram and get user selection
+    telegram.clear_old_updates()
     telegram.send_options(top_topics)
-    selected_option = telegram.get_user_selected_option()
-
-    selected_topic_idx = int(selected_option.split()[-1]) - 1
-    if selected_topic_idx < 0 or selected_topic_idx >= len(top_topics):
-        telegram.send_message("Invalid selection. Proceeding with the first topic.")
-        selected_topic_idx = 0
-
-    selected_topic = top_topics[selected_topic_idx][0]
-    telegram.send_message(f"Selected topic: {selected_topic}")
 
-    # Step 5: Generate the blog
-    blog_post = generate_blog_with_references(selected_topic, data)
-    if not blog_post:
-        telegram.send_message("Blog generation failed. Exiting process.")
-        return
+    # Draft the leading candidates while the user decides (speculation: SpeculativeDrafter arguments)
+    drafter = None
+    if speculation:
+        drafter = SpeculativeDrafter(data, **speculation)
+        drafter.start([topic for topic, _ in top_topics])
+    try:
+        with tracer.span("selection"):
+            selected_option = telegram.get_user_selected_option()
 
-    # Step 6: Generate title, tags, and image prompt
-    title = generate_title(blog_post)
-    tags = generate_trending_tags(blog_post)
-    image_prompt = generate_image_prompt(blog_post)
+        try:
+            selected_topic_idx = int(selected_option.split()[-1]) - 1
+        except (ValueError, IndexError):
+            selected_topic_idx = -1
+        if selected_topic_idx < 0 or selected_topic_idx >= len(top_topics):
+            telegram.notify("Invalid selection. Proceeding with the first topic.")
+            selected_topic_idx = 0
 
-    # Step 7: Generate the image (e.g., using Stable Diffusion)
-    telegram.send_message("Generating the image for the blog... 🎨")
-    from diffusers import StableDiffusionPipeline
-    import torch
+        selected_topic = top_topics[selected_topic_idx][0]
+        telegram.notify(f"Selected topic: {selected_topic}")
 
-    model_id = "CompVis/stable-diffusion-v1-4"
-    pipe = StableDiffusionPipeline.from_pretrained(model_id, torch_dtype=torch.float16)
-    pipe = pipe.to("cuda")
+        # Step 5: Generate the blog (platform authentication runs in the background meanwhile)
+        publisher.warm_up()
+        if drafter is not None:
+            with tracer.span("blog_generation", topic=selected_topic, speculative=True):
+                post, stats = drafter.resolve(selected_topic_idx, selected_topic)
+    finally:
+        if drafter is not None:
+            drafter.close()
 
-    width, height = 768, 512
-    image = pipe(prompt=image_prompt, height=height, width=width).images[0]
-    image.save("generated_image.png")
+    if drafter is not None:
+        if stats["hit"]:
+            state = "ready" if stats["ready"] else "resumed"
+            telegram.notify(f"Speculative draft {state}: saved {stats['saved_seconds']:.0f}s.")
+        if not post:
+            telegram.notify("Blog generation failed. Exiting process.")
+            return
+        blog_post, title, tags, image_prompt = post["blog_post"], post["title"], post["tags"], post["image_prompt"]
+    elif cluster is not None:
+        # Step 5 and 6 run as one task on whichever node claims it, and are taken over if that node dies.
+        with tracer.span("blog_generation", topic=selected_topic):
+            post = cluster.generate_post(selected_topic, data)
+        if not post:
+            telegram.notify("Blog generation failed. Exiting process.")
+            return
+        blog_post, title, tags, image_prompt = post["blog_post"], post["title"], post["tags"], post["image_prompt"]
+    else:
+        with tracer.span("blog_generation", topic=selected_topic):
+            blog_post = generate_blog_with_references(selected_topic, data)
+        if not blog_post:
+            telegram.notify("Blog generation failed. Exiting process.")
+            return
 
-    telegram.send_message("Image generated successfully! 🖼️")
+        # Step 6: Generate title, tags, and image prompt
+        title = generate_title(blog_post)
+        tags = generate_trending_tags(blog_post)
+        image_prompt = generate_image_prompt(blog_post)
 
-    # Step 8: Publish to Medium
-    user_id = medium.get_user_id()
-    if user_id:
-        medium_response = medium.create_medium_post(
-            user_id, title, blog_post, content_format="html", tags=tags
-        )
-        if medium_response:
-            telegram.send_message(f"Blog successfully posted on Medium! 🚀\nURL: {medium_response['data']['url']}")
+    # Step 7: Generate the image (e.g., using Stable Diffusion), upload resized variants and embed them
+    if generate_image:
+        telegram.notify("Generating the image for the blog... 🎨")
+        image = generate_blog_image(image_prompt)
+        if s3_manager is not None:
+            blog_post, uploaded = publish_image_assets(s3_manager, image, blog_post, alt=title, key_prefix=image_key_prefix)
+            if uploaded:
+                reused = sum(not variant["uploaded"] for variant in uploaded)
+                telegram.notify(f"Image generated and uploaded ({len(uploaded)} variants, {reused} already in S3)! 🖼️")
+            else:
+                telegram.notify("Image generated, but uploading it failed; publishing without it.")
         else:
-            telegram.send_message("Failed to post blog on Medium.")
-
-    # Step 9: Publish to Blogger
-    credentials = blogger.get_credentials()
-    if credentials:
-        blogger_response = blogger.create_blog_post(title, blog_post)
-        if blogger_response:
-            telegram.send_message(f"Blog successfully posted on Blogger! 📝\nURL: {blogger_response['url']}")
+            telegram.notify("Image generated successfully! 🖼️")
+
+    # Step 8: Queue the post in the outbox and publish it, along with any earlier posts due for a retry
+    post_key = outbox.enqueue(title, blog_post, tags=tags, platforms=[platform.name for platform in publisher.platforms])
+    drained = outbox.drain(publisher)
+    for platform_name, result in drained.pop(post_key, {}).items():
+        print(f"{platform_name}: warm-up {result['warm_up_seconds']:.2f}s, publish {result['publish_seconds']:.2f}s")
+        if result["success"]:
+            telegram.notify(f"Blog successfully posted on {platform_name}! 🚀\nURL: {result['url']}")
         else:
-            telegram.send_message("Failed to post blog on Blogger.")
+            telegram.notify(f"Failed to post blog on {platform_name}; it will be retried from the outbox.")
+    retried = [result for post in drained.values() for result in post.values()]
+    if retried:
+        telegram.notify(f"Retried {len(retried)} queued post(s) from the outbox: {sum(r['success'] for r in retried)} published.")
 
-    # Step 10: Completion message
-    telegram.send_message("All processes completed successfully! 🎉")
+    # Step 9: Completion message
+    telegram.notify("All processes completed successfully! 🎉")
 
 if __name__ == "__main__":
     main()
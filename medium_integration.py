@@ -1,16 +1,23 @@
 import requests
 import json
 
+# Well below the outbox lease, so a hung request cannot outlive its claim on a post.
+REQUEST_TIMEOUT = 60
+
 class MediumIntegration:
-    def __init__(self, integration_token):
+    def __init__(self, integration_token, base_url="https://api.medium.com/v1", timeout=REQUEST_TIMEOUT):
         """
         Initialize the MediumIntegration.
 
         Parameters:
         - integration_token (str): Medium integration token.
+        - base_url (str): Base URL of the Medium API.
+        - timeout (float): Seconds before a request is abandoned.
         """
         self.integration_token = integration_token
-        self.base_url = "https://api.medium.com/v1"
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
 
     def get_user_id(self):
         """
@@ -23,7 +30,7 @@ class MediumIntegration:
         headers = {"Authorization": f"Bearer {self.integration_token}"}
         
         try:
-            response = requests.get(url, headers=headers)
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
             response.raise_for_status()
             user_info = response.json()
             return user_info.get('data', {}).get('id')
@@ -61,7 +68,7 @@ class MediumIntegration:
         }
 
         try:
-            response = requests.post(url, headers=headers, data=json.dumps(data))
+            response = self.session.post(url, headers=headers, data=json.dumps(data), timeout=self.timeout)
             response.raise_for_status()
             return response.json()
         except Exception as e:
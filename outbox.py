@@ -0,0 +1,258 @@
+import argparse
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    idempotency_key TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_until REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    url TEXT,
+    response TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (idempotency_key, platform)
+)
+"""
+
+def make_idempotency_key(title, content):
+    """
+    Derive a stable key for a post, so enqueueing the same draft twice is a no-op.
+    """
+    return hashlib.sha256(f"{title}\n{content}".encode("utf-8")).hexdigest()[:32]
+
+class PublishingOutbox:
+    def __init__(self, path="outbox.db", max_attempts=5, base_delay=30.0, max_delay=3600.0,
+                 lease_seconds=600.0, platform_concurrency=None, max_workers=8):
+        """
+        Initialize the PublishingOutbox.
+
+        Generated posts are stored in a local SQLite database, one row per
+        (post, platform). `drain` publishes due rows with exponential backoff and
+        per-platform concurrency limits, and records the outcome. Because the rows
+        live on disk, a post that fails to publish is retried later instead of
+        being regenerated. Published rows are never claimed again; the only window
+        for a duplicate is a crash between a successful publish and recording it.
+
+        Parameters:
+        - path (str): SQLite database file.
+        - max_attempts (int): Attempts per platform before a post is marked failed.
+        - base_delay (float): Backoff in seconds after the first failure; doubles per attempt.
+        - max_delay (float): Upper bound of the backoff in seconds.
+        - lease_seconds (float): How long a claimed row is reserved. Rows left in progress
+          by a crashed process become due again once their lease expires.
+        - platform_concurrency (dict): Maximum parallel publishes per platform name (default 1).
+        - max_workers (int): Worker threads used by `drain`.
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_seconds = lease_seconds
+        self.platform_concurrency = platform_concurrency or {}
+        self.max_workers = max_workers
+        self._semaphores = {}
+        self._semaphores_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+
+    def enqueue(self, title, content, tags=None, platforms=("Medium", "Blogger"), idempotency_key=None):
+        """
+        Add a post to the outbox for each platform.
+
+        Parameters:
+        - title (str): The title of the post.
+        - content (str): HTML content of the post.
+        - tags (list): List of tags for the post.
+        - platforms (list): Platform names to publish to.
+        - idempotency_key (str): Key identifying the post; derived from title and content if omitted.
+
+        Returns:
+        - str: The idempotency key. Rows that already exist for this key are left untouched.
+        """
+        key = idempotency_key or make_idempotency_key(title, content)
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, platform, title, content, tags, next_attempt_at, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(key, platform, title, content, json.dumps(tags or []), now, now, now) for platform in platforms],
+            )
+        return key
+
+    def drain(self, publisher, keys=None, limit=None):
+        """
+        Publish every due post in the outbox.
+
+        Parameters:
+        - publisher (Publisher): Provides the configured platforms and their warm-ups.
+        - keys (list): Only publish these idempotency keys; all due posts if omitted.
+        - limit (int): Maximum number of (post, platform) rows to claim.
+
+        Returns:
+        - dict: {idempotency_key: {platform: result}} for every row attempted, where
+          result is the Publisher's per-platform result dict.
+        """
+        platforms = [platform.name for platform in publisher.platforms]
+        rows = self._claim(platforms, keys, limit)
+        if not rows:
+            return {}
+
+        publisher.warm_up()
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(rows))) as executor:
+            futures = [(row, executor.submit(self._publish_row, publisher, row)) for row in rows]
+            for row, future in futures:
+                results.setdefault(row["idempotency_key"], {})[row["platform"]] = future.result()
+        publisher.reset_warm_ups()
+        return results
+
+    def status(self):
+        """
+        Count rows by platform and status.
+
+        Returns:
+        - dict: {platform: {status: count}}.
+        """
+        counts = {}
+        with self._connect() as conn:
+            for platform, status, count in conn.execute(
+                "SELECT platform, status, COUNT(*) FROM outbox GROUP BY platform, status"
+            ):
+                counts.setdefault(platform, {})[status] = count
+        return counts
+
+    def _claim(self, platforms, keys, limit):
+        now = time.time()
+        query = (
+            "SELECT * FROM outbox WHERE next_attempt_at <= ? AND "
+            "(status = 'pending' OR (status = 'in_progress' AND lease_until <= ?)) "
+            f"AND platform IN ({','.join('?' * len(platforms))})"
+        )
+        params = [now, now, *platforms]
+        if keys is not None:
+            query += f" AND idempotency_key IN ({','.join('?' * len(keys))})"
+            params.extend(keys)
+        query += " ORDER BY created_at"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock, so concurrent drains never claim the same row.
+            conn.execute("BEGIN IMMEDIATE")
+            rows = [dict(row) for row in conn.execute(query, params)]
+            conn.executemany(
+                "UPDATE outbox SET status = 'in_progress', lease_until = ?, updated_at = ? "
+                "WHERE idempotency_key = ? AND platform = ?",
+                [(now + self.lease_seconds, now, row["idempotency_key"], row["platform"]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return rows
+
+    def _publish_row(self, publisher, row):
+        with self._semaphore(row["platform"]):
+            result = publisher.publish_to(row["platform"], row["title"], row["content"], json.loads(row["tags"]))
+
+        now = time.time()
+        attempts = row["attempts"] + 1
+        with self._connect() as conn:
+            if result["success"]:
+                conn.execute(
+                    "UPDATE outbox SET status = 'published', attempts = ?, url = ?, response = ?, last_error = NULL, "
+                    "updated_at = ? WHERE idempotency_key = ? AND platform = ?",
+                    (attempts, result["url"], json.dumps(result["response"], default=str), now,
+                     row["idempotency_key"], row["platform"]),
+                )
+            else:
+                status = "failed" if attempts >= self.max_attempts else "pending"
+                conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? "
+                    "WHERE idempotency_key = ? AND platform = ?",
+                    (status, attempts, now + self._backoff(attempts), result["error"], now,
+                     row["idempotency_key"], row["platform"]),
+                )
+        result["attempts"] = attempts
+        return result
+
+    def _backoff(self, attempts):
+        delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+        return delay * random.uniform(0.8, 1.2)
+
+    def _semaphore(self, platform):
+        with self._semaphores_lock:
+            if platform not in self._semaphores:
+                self._semaphores[platform] = threading.BoundedSemaphore(self.platform_concurrency.get(platform, 1))
+            return self._semaphores[platform]
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return _AutoClosingConnection(conn)
+
+class _AutoClosingConnection:
+    """sqlite3 connection whose context manager also closes it."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.conn.close()
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the durable publishing outbox.")
+    parser.add_argument("--path", default=None, help="Outbox database file; defaults to OUTBOX_PATH.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    enqueue_parser = subparsers.add_parser("enqueue", help="Queue draft JSON files ({title, content, tags}).")
+    enqueue_parser.add_argument("drafts", nargs="+")
+    drain_parser = subparsers.add_parser("drain", help="Publish every due post.")
+    drain_parser.add_argument("--limit", type=int, default=None)
+    subparsers.add_parser("status", help="Show counts per platform and status.")
+    args = parser.parse_args()
+
+    from main import PLATFORM_CONCURRENCY, load_settings, create_s3_manager, create_publisher
+
+    settings = load_settings()
+    outbox = PublishingOutbox(path=args.path or settings["OUTBOX_PATH"], platform_concurrency=PLATFORM_CONCURRENCY)
+    if args.command == "enqueue":
+        for draft_path in args.drafts:
+            with open(draft_path) as f:
+                draft = json.load(f)
+            key = outbox.enqueue(draft["title"], draft["content"], tags=draft.get("tags"))
+            print(f"Queued '{draft['title']}' as {key}.")
+    elif args.command == "drain":
+        # Only the publishing clients: no Telegram bot or webhook, which a running daemon owns.
+        _, _, publisher = create_publisher(settings, create_s3_manager(settings))
+        try:
+            results = outbox.drain(publisher, limit=args.limit)
+        finally:
+            publisher.close()
+        published = sum(result["success"] for post in results.values() for result in post.values())
+        print(f"Published {published} of {sum(len(post) for post in results.values())} attempted post(s).")
+    print(json.dumps(outbox.status(), indent=4))
@@ -0,0 +1,239 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import tracer
+
+
+class MediumPlatform:
+    name = "Medium"
+
+    def __init__(self, medium):
+        """
+        Wrap a MediumIntegration so it can be driven by the Publisher.
+
+        Parameters:
+        - medium (MediumIntegration): Configured Medium client.
+        """
+        self.medium = medium
+        self.user_id = None
+
+    def warm_up(self):
+        """
+        Resolve the Medium user ID ahead of publishing. The ID is kept for later runs.
+
+        Returns:
+        - bool: True if the platform is ready to publish, False otherwise.
+        """
+        if self.user_id is None:
+            self.user_id = self.medium.get_user_id()
+        return self.user_id is not None
+
+    def publish(self, title, content, tags=None):
+        """
+        Publish an HTML post to Medium.
+
+        Returns:
+        - dict: Response JSON if successful, None otherwise.
+        """
+        return self.medium.create_medium_post(self.user_id, title, content, content_format="html", tags=tags)
+
+    def post_url(self, response):
+        return response["data"]["url"]
+
+
+class BloggerPlatform:
+    name = "Blogger"
+
+    def __init__(self, blogger):
+        """
+        Wrap a BloggerIntegration so it can be driven by the Publisher.
+
+        Parameters:
+        - blogger (BloggerIntegration): Configured Blogger client.
+        """
+        self.blogger = blogger
+
+    def warm_up(self):
+        """
+        Refresh the Google credentials ahead of publishing.
+
+        Returns:
+        - bool: True if the platform is ready to publish, False otherwise.
+        """
+        return self.blogger.get_credentials() is not None
+
+    def publish(self, title, content, tags=None):
+        """
+        Publish an HTML post to Blogger. Tags are not used by Blogger.
+
+        Returns:
+        - dict: Response JSON if successful, None otherwise.
+        """
+        return self.blogger.create_blog_post(title, content)
+
+    def post_url(self, response):
+        return response["url"]
+
+
+class Publisher:
+    def __init__(self, platforms, max_workers=None):
+        """
+        Initialize the Publisher.
+
+        A platform is any object with a `name` attribute and `warm_up()`,
+        `publish(title, content, tags)` and `post_url(response)` methods.
+
+        Parameters:
+        - platforms (list): Platforms to publish to.
+        - max_workers (int): Worker threads; defaults to one per platform.
+        """
+        self.platforms = list(platforms)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or max(len(self.platforms), 1))
+        self._warm_ups = {}
+
+    def warm_up(self):
+        """
+        Start authenticating with every platform in the background.
+
+        Calling this more than once has no effect; `publish` waits for the
+        warm-ups started here instead of repeating them.
+        """
+        for platform in self.platforms:
+            if platform.name not in self._warm_ups:
+                self._warm_ups[platform.name] = self.executor.submit(self._warm_up, platform)
+
+    def publish(self, title, content, tags=None):
+        """
+        Publish a post to every platform concurrently.
+
+        Parameters:
+        - title (str): The title of the post.
+        - content (str): HTML content of the post.
+        - tags (list): List of tags for the post.
+
+        Returns:
+        - dict: Per-platform result keyed by platform name, with `success`,
+          `url`, `response`, `error`, `warm_up_seconds` and `publish_seconds`.
+        """
+        self.warm_up()
+        futures = {
+            platform.name: self.executor.submit(self._publish_to, platform, title, content, tags)
+            for platform in self.platforms
+        }
+        results = {name: future.result() for name, future in futures.items()}
+        self.reset_warm_ups()
+        return results
+
+    def publish_to(self, platform_name, title, content, tags=None):
+        """
+        Publish a post to a single platform, waiting for its warm-up first.
+
+        Parameters:
+        - platform_name (str): Name of a configured platform.
+        - title (str): The title of the post.
+        - content (str): HTML content of the post.
+        - tags (list): List of tags for the post.
+
+        Returns:
+        - dict: The platform's result, as in `publish`; unsuccessful with error
+          "unknown platform" if no platform has this name.
+        """
+        platform = self.platform(platform_name)
+        if platform is None:
+            return {
+                "success": False,
+                "url": None,
+                "response": None,
+                "error": "unknown platform",
+                "warm_up_seconds": 0.0,
+                "publish_seconds": 0.0,
+            }
+        self.warm_up()
+        return self._publish_to(platform, title, content, tags)
+
+    def platform(self, name):
+        """
+        Return the configured platform with this name, or None.
+        """
+        return next((platform for platform in self.platforms if platform.name == name), None)
+
+    def reset_warm_ups(self):
+        """
+        Forget completed warm-ups so the next post warms up again and picks up
+        expired credentials in long-lived processes.
+        """
+        self._warm_ups = {}
+
+    def close(self):
+        """
+        Wait for pending work and release the worker threads.
+        """
+        self.executor.shutdown(wait=True)
+
+    def _warm_up(self, platform):
+        with tracer.span("publish_warm_up", platform=platform.name):
+            return self._timed(platform.warm_up)
+
+    def _publish_to(self, platform, title, content, tags):
+        ready, warm_up_seconds, error = self._warm_ups[platform.name].result()
+        result = {
+            "success": False,
+            "url": None,
+            "response": None,
+            "error": error,
+            "warm_up_seconds": warm_up_seconds,
+            "publish_seconds": 0.0,
+        }
+        if not ready:
+            result["error"] = result["error"] or "warm-up failed"
+            return result
+
+        with tracer.span("publish", platform=platform.name) as span:
+            response, result["publish_seconds"], result["error"] = self._timed(platform.publish, title, content, tags)
+            span.set("success", bool(response))
+        if response:
+            result["success"] = True
+            result["response"] = response
+            try:
+                result["url"] = platform.post_url(response)
+            except Exception as e:
+                # The post is live; an unexpected response shape must not get it published again.
+                print(f"Published to {platform.name}, but could not read the post URL: {e}")
+        else:
+            result["error"] = result["error"] or "publish failed"
+        return result
+
+    @staticmethod
+    def _timed(func, *args):
+        start = time.perf_counter()
+        try:
+            value, error = func(*args), None
+        except Exception as e:
+            print(f"Error in {getattr(func, '__qualname__', func)}: {e}")
+            value, error = None, str(e)
+        return value, time.perf_counter() - start, error
+
+
+if __name__ == "__main__":
+    class _DemoPlatform:
+        def __init__(self, name, delay):
+            self.name = name
+            self.delay = delay
+
+        def warm_up(self):
+            time.sleep(self.delay)
+            return True
+
+        def publish(self, title, content, tags=None):
+            time.sleep(self.delay)
+            return {"url": f"https://example.com/{self.name.lower()}/post"}
+
+        def post_url(self, response):
+            return response["url"]
+
+    publisher = Publisher([_DemoPlatform("Alpha", 0.5), _DemoPlatform("Beta", 0.3)])
+    publisher.warm_up()
+    results = publisher.publish("Exploring AI in Healthcare", "<h1>Exploring AI in Healthcare</h1>")
+    publisher.close()
+    for name, result in results.items():
+        print(f"{name}: success={result['success']} url={result['url']} "
+              f"warm_up={result['warm_up_seconds']:.2f}s publish={result['publish_seconds']:.2f}s")
@@ -1,7 +1,24 @@
+import io
+import itertools
+import json
+import os
+import tempfile
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+import numpy as np
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from instrumentation import tracer
+
+PART_SIZE = 8 * 1024 * 1024
+# S3 rejects multipart uploads whose non-final parts are smaller than this.
+MIN_PART_SIZE = 5 * 1024 * 1024
 
 class S3Manager:
-    def __init__(self, aws_access_key_id, aws_secret_access_key, region_name, bucket_name):
+    def __init__(self, aws_access_key_id, aws_secret_access_key, region_name, bucket_name, endpoint_url=None,
+                 public_base_url=None, cache_dir="s3_cache", part_size=PART_SIZE, max_workers=8):
         """
         Initialize the S3Manager.
 
@@ -10,14 +27,38 @@ class S3Manager:
         - aws_secret_access_key (str): AWS secret access key.
         - region_name (str): AWS region name.
         - bucket_name (str): Name of the S3 bucket.
+        - endpoint_url (str): Override for the S3 endpoint, e.g. a local S3-compatible server.
+        - public_base_url (str): Base URL objects are served from (e.g. a CDN); defaults to the bucket URL.
+        - cache_dir (str): Local read-through cache for artifacts, validated by ETag.
+        - part_size (int): Multipart upload part and ranged download chunk size in bytes (at least 5 MiB).
+        - max_workers (int): Parallel part transfers per upload or download.
         """
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes.")
         self.bucket_name = bucket_name
+        self.region_name = region_name
+        self.endpoint_url = endpoint_url
+        self.public_base_url = public_base_url
+        self.cache_dir = cache_dir
+        self.part_size = part_size
+        self.max_workers = max_workers
         self.s3_client = boto3.client(
             's3',
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key,
-            region_name=region_name
+            region_name=region_name,
+            endpoint_url=endpoint_url,
+            config=Config(
+                # One pooled connection per concurrent part transfer.
+                max_pool_connections=max(10, max_workers * 2),
+                # Local stand-ins serve buckets by path rather than by subdomain.
+                s3={'addressing_style': 'path'} if endpoint_url else None,
+            )
         )
+        # Conditional writes (If-Match / If-None-Match on PutObject) are sent as headers,
+        # whether or not the installed botocore models them as parameters.
+        self.s3_client.meta.events.register("before-parameter-build.s3.PutObject", _pop_write_conditions)
+        self.s3_client.meta.events.register("before-call.s3.PutObject", _add_write_condition_headers)
 
     def save_token_to_s3(self, token_path, token):
         """
@@ -60,6 +101,463 @@ class S3Manager:
             print(f"Error loading token from S3: {e}")
             return None
 
+    def object_exists(self, key):
+        """
+        Check whether an object exists in the S3 bucket.
+
+        Parameters:
+        - key (str): Path in the S3 bucket.
+
+        Returns:
+        - bool: True if the object exists, False otherwise.
+        """
+        try:
+            self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+            return True
+        except Exception:
+            return False
+
+    def upload_bytes(self, key, data, content_type=None, cache_control=None):
+        """
+        Upload an in-memory object to the S3 bucket.
+
+        Parameters:
+        - key (str): Path in the S3 bucket.
+        - data (bytes): Object content.
+        - content_type (str): MIME type served with the object.
+        - cache_control (str): Cache-Control header served with the object.
+
+        Returns:
+        - bool: True if the object was uploaded successfully, False otherwise.
+        """
+        extra = {}
+        if content_type:
+            extra["ContentType"] = content_type
+        if cache_control:
+            extra["CacheControl"] = cache_control
+        try:
+            self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=data, **extra)
+            return True
+        except Exception as e:
+            print(f"Error uploading '{key}' to S3: {e}")
+            return False
+
+    def object_url(self, key):
+        """
+        Public URL of an object in the S3 bucket.
+
+        Parameters:
+        - key (str): Path in the S3 bucket.
+
+        Returns:
+        - str: The URL.
+        """
+        if self.public_base_url:
+            return f"{self.public_base_url.rstrip('/')}/{key}"
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket_name}/{key}"
+        return f"https://{self.bucket_name}.s3.{self.region_name}.amazonaws.com/{key}"
+
+    def put_json(self, key, data, if_none_match=False, if_match=None):
+        """
+        Write a small JSON control object, optionally only under a precondition.
+
+        Parameters:
+        - key (str): Path in the S3 bucket.
+        - data: JSON-serializable content.
+        - if_none_match (bool): Only create the object if it does not exist yet.
+        - if_match (str): Only replace the object if its ETag still equals this one.
+
+        Returns:
+        - str: The ETag of the written object, or None if the precondition failed or the write errored.
+        """
+        conditions = {}
+        if if_none_match:
+            conditions["IfNoneMatch"] = "*"
+        if if_match:
+            conditions["IfMatch"] = if_match
+        try:
+            response = self.s3_client.put_object(
+                Bucket=self.bucket_name, Key=key, Body=json.dumps(data).encode("utf-8"),
+                ContentType="application/json", **conditions
+            )
+            return response["ETag"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("PreconditionFailed", "ConditionalRequestConflict", "412", "409"):
+                print(f"Error writing '{key}' to S3: {e}")
+            return None
+        except Exception as e:
+            print(f"Error writing '{key}' to S3: {e}")
+            return None
+
+    def get_json(self, key):
+        """
+        Read a small JSON control object, bypassing the local cache.
+
+        Parameters:
+        - key (str): Path in the S3 bucket.
+
+        Returns:
+        - tuple: (data, etag), or (None, None) if the object does not exist or could not be read.
+        """
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+            return json.loads(response["Body"].read()), response["ETag"]
+        except self.s3_client.exceptions.NoSuchKey:
+            return None, None
+        except Exception as e:
+            print(f"Error reading '{key}' from S3: {e}")
+            return None, None
+
+    def delete_object(self, key):
+        """
+        Delete an object from the S3 bucket.
+
+        Returns:
+        - bool: True if the request succeeded (also when the object did not exist).
+        """
+        try:
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
+            return True
+        except Exception as e:
+            print(f"Error deleting '{key}' from S3: {e}")
+            return False
+
+    def list_keys(self, prefix):
+        """
+        List the keys under a prefix.
+
+        Parameters:
+        - prefix (str): Key prefix.
+
+        Returns:
+        - list: Keys in lexicographic order (empty if the listing failed).
+        """
+        keys = []
+        try:
+            for page in self.s3_client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket_name, Prefix=prefix):
+                keys.extend(item["Key"] for item in page.get("Contents", []))
+        except Exception as e:
+            print(f"Error listing '{prefix}' in S3: {e}")
+        return keys
+
+    def upload_file(self, key, file_path, compress=False, content_type=None):
+        """
+        Upload a local file to the S3 bucket; see upload_stream().
+
+        Returns:
+        - str: The ETag of the stored object, or None if the upload failed.
+        """
+        with open(file_path, "rb") as f:
+            return self.upload_stream(key, f, compress=compress, content_type=content_type)
+
+    def upload_stream(self, key, stream, compress=False, content_type=None):
+        """
+        Upload a binary stream to the S3 bucket without holding it in memory.
+
+        Streams up to one part are stored with a single PUT. Larger streams are sent
+        as a multipart upload whose parts are transferred concurrently; at most
+        2 * max_workers parts are buffered at a time.
+
+        Parameters:
+        - key (str): Path in the S3 bucket.
+        - stream (file): Binary file object to read from.
+        - compress (bool): Gzip the content on the fly. The object is marked with
+          `compression: gzip` metadata and decompressed transparently on download.
+        - content_type (str): MIME type of the (uncompressed) content.
+
+        Returns:
+        - str: The ETag of the stored object, or None if the upload failed.
+        """
+        extra = {}
+        if content_type:
+            extra["ContentType"] = content_type
+        if compress:
+            extra["Metadata"] = {"compression": "gzip"}
+        parts = self._iter_parts(stream, compress)
+        with tracer.span("s3_upload", key=key, compress=compress):
+            try:
+                first = next(parts)
+                second = next(parts, None)
+                if second is None:
+                    response = self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=first, **extra)
+                    tracer.count("s3_uploaded_bytes", len(first))
+                    return response["ETag"]
+                return self._multipart_upload(key, [first, second], parts, extra)
+            except Exception as e:
+                print(f"Error uploading '{key}' to S3: {e}")
+                return None
+
+    def download_file(self, key, file_path):
+        """
+        Download an object to a local file using concurrent ranged GETs.
+
+        Every range is requested with If-Match on the ETag seen at the start, so an
+        object replaced mid-download fails instead of producing a mixed file. Gzip
+        artifacts are decompressed. The file is written atomically.
+
+        Parameters:
+        - key (str): Path in the S3 bucket.
+        - file_path (str): Destination path.
+
+        Returns:
+        - str: The ETag of the downloaded object, or None if the download failed.
+        """
+        try:
+            head = self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+            self._download(key, file_path, head)
+            return head["ETag"]
+        except Exception as e:
+            print(f"Error downloading '{key}' from S3: {e}")
+            return None
+
+    def read_range(self, key, start, end):
+        """
+        Read a byte range of a stored object.
+
+        Parameters:
+        - key (str): Path in the S3 bucket.
+        - start (int): First byte offset.
+        - end (int): Last byte offset (inclusive).
+
+        Returns:
+        - bytes: The stored bytes in that range (compressed artifacts are not decompressed),
+          or None if the read failed.
+        """
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key, Range=f"bytes={start}-{end}")
+            data = response["Body"].read()
+        except Exception as e:
+            print(f"Error reading bytes {start}-{end} of '{key}' from S3: {e}")
+            return None
+        tracer.count("s3_downloaded_bytes", len(data))
+        return data
+
+    def cached_path(self, key):
+        """
+        Local path of an artifact, downloading it only if the cached copy is missing or stale.
+
+        A HEAD request compares the object's ETag with the one recorded for the cached
+        copy. If S3 cannot be reached, an existing cached copy is returned as is.
+
+        Parameters:
+        - key (str): Path in the S3 bucket.
+
+        Returns:
+        - str: Path of the local copy, or None if the object could not be fetched.
+        """
+        local_path = os.path.join(self.cache_dir, *key.split("/"))
+        if os.path.commonpath([os.path.abspath(self.cache_dir), os.path.abspath(local_path)]) != os.path.abspath(self.cache_dir):
+            print(f"Refusing to cache '{key}' outside '{self.cache_dir}'.")
+            return None
+        etag_path = local_path + ".etag"
+        try:
+            head = self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+        except Exception as e:
+            if os.path.exists(local_path):
+                print(f"Could not validate '{key}' ({e}); using the cached copy.")
+                return local_path
+            print(f"Error fetching '{key}' from S3: {e}")
+            return None
+
+        if os.path.exists(local_path) and os.path.exists(etag_path):
+            with open(etag_path) as f:
+                if f.read() == head["ETag"]:
+                    tracer.count("s3_cache_hits", 1)
+                    return local_path
+        tracer.count("s3_cache_misses", 1)
+        try:
+            self._download(key, local_path, head)
+        except Exception as e:
+            print(f"Error downloading '{key}' from S3: {e}")
+            return None
+        with open(etag_path, "w") as f:
+            f.write(head["ETag"])
+        return local_path
+
+    def cached_paths(self, keys):
+        """
+        Fetch several artifacts through the cache concurrently.
+
+        Returns:
+        - dict: {key: local path or None}.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(keys))) as executor:
+            return dict(zip(keys, executor.map(self.cached_path, keys)))
+
+    def save_json(self, key, data, compress=True):
+        """
+        Store a JSON document, e.g. an article corpus.
+
+        Returns:
+        - str: The ETag, or None if the upload failed.
+        """
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        return self.upload_stream(key, io.BytesIO(body), compress=compress, content_type="application/json")
+
+    def load_json(self, key):
+        """
+        Load a JSON document through the local cache.
+
+        Returns:
+        - The decoded document, or None if it could not be fetched.
+        """
+        path = self.cached_path(key)
+        if path is None:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_array(self, key, array, compress=False):
+        """
+        Store a numpy array, e.g. an embedding matrix, in .npy format.
+
+        Returns:
+        - str: The ETag, or None if the upload failed.
+        """
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(array), allow_pickle=False)
+        buffer.seek(0)
+        return self.upload_stream(key, buffer, compress=compress, content_type="application/octet-stream")
+
+    def load_array(self, key, mmap_mode=None):
+        """
+        Load a numpy array through the local cache.
+
+        Parameters:
+        - key (str): Path in the S3 bucket.
+        - mmap_mode (str): Passed to numpy.load, e.g. "r" to memory-map the cached copy.
+
+        Returns:
+        - numpy.ndarray: The array, or None if it could not be fetched.
+        """
+        path = self.cached_path(key)
+        if path is None:
+            return None
+        return np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+
+    def _iter_parts(self, stream, compress):
+        compressor = zlib.compressobj(wbits=31) if compress else None
+        buffer = bytearray()
+        yielded = False
+        while True:
+            chunk = stream.read(self.part_size)
+            if not chunk:
+                break
+            buffer += compressor.compress(chunk) if compressor else chunk
+            while len(buffer) >= self.part_size:
+                yield bytes(buffer[:self.part_size])
+                del buffer[:self.part_size]
+                yielded = True
+        if compressor:
+            buffer += compressor.flush()
+        if buffer or not yielded:
+            yield bytes(buffer)
+
+    def _multipart_upload(self, key, first_parts, remaining_parts, extra):
+        upload_id = self.s3_client.create_multipart_upload(Bucket=self.bucket_name, Key=key, **extra)["UploadId"]
+        in_flight = threading.BoundedSemaphore(self.max_workers * 2)
+
+        def upload_part(number, body):
+            try:
+                response = self.s3_client.upload_part(
+                    Bucket=self.bucket_name, Key=key, UploadId=upload_id, PartNumber=number, Body=body
+                )
+                tracer.count("s3_uploaded_bytes", len(body))
+                return {"PartNumber": number, "ETag": response["ETag"]}
+            finally:
+                in_flight.release()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = []
+                for number, body in enumerate(itertools.chain(first_parts, remaining_parts), start=1):
+                    in_flight.acquire()
+                    futures.append(executor.submit(upload_part, number, body))
+                parts = [future.result() for future in futures]
+            response = self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+            return response["ETag"]
+        except Exception:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+            raise
+
+    def _download(self, key, file_path, head):
+        size = head["ContentLength"]
+        etag = head["ETag"]
+        compressed = head.get("Metadata", {}).get("compression") == "gzip"
+        directory = os.path.dirname(os.path.abspath(file_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, raw_path = tempfile.mkstemp(dir=directory, prefix=".download-")
+        os.close(fd)
+        try:
+            with tracer.span("s3_download", key=key, bytes=size):
+                self._download_ranges(key, raw_path, size, etag)
+            if compressed:
+                fd, plain_path = tempfile.mkstemp(dir=directory, prefix=".download-")
+                os.close(fd)
+                try:
+                    _gunzip(raw_path, plain_path)
+                    os.replace(plain_path, file_path)
+                finally:
+                    if os.path.exists(plain_path):
+                        os.remove(plain_path)
+            else:
+                os.replace(raw_path, file_path)
+        finally:
+            if os.path.exists(raw_path):
+                os.remove(raw_path)
+
+    def _download_ranges(self, key, path, size, etag):
+        ranges = [(start, min(start + self.part_size, size) - 1) for start in range(0, size, self.part_size)]
+        write_lock = threading.Lock()
+        with open(path, "r+b") as f:
+            f.truncate(size)
+
+            def fetch(byte_range):
+                start, end = byte_range
+                response = self.s3_client.get_object(
+                    Bucket=self.bucket_name, Key=key, Range=f"bytes={start}-{end}", IfMatch=etag
+                )
+                data = response["Body"].read()
+                if len(data) != end - start + 1:
+                    raise IOError(f"Short read for bytes {start}-{end} of '{key}'.")
+                with write_lock:
+                    f.seek(start)
+                    f.write(data)
+                tracer.count("s3_downloaded_bytes", len(data))
+
+            if len(ranges) == 1:
+                fetch(ranges[0])
+            elif ranges:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(ranges))) as executor:
+                    list(executor.map(fetch, ranges))
+
+
+def _pop_write_conditions(params, context, **kwargs):
+    for name in ("IfMatch", "IfNoneMatch"):
+        if name in params:
+            context.setdefault("write_conditions", {})[name] = params.pop(name)
+
+
+def _add_write_condition_headers(params, context, **kwargs):
+    conditions = context.get("write_conditions", {})
+    if "IfMatch" in conditions:
+        params["headers"]["If-Match"] = conditions["IfMatch"]
+    if "IfNoneMatch" in conditions:
+        params["headers"]["If-None-Match"] = conditions["IfNoneMatch"]
+
+
+def _gunzip(source_path, target_path, chunk_size=1024 * 1024):
+    decompressor = zlib.decompressobj(wbits=31)
+    with open(source_path, "rb") as source, open(target_path, "wb") as target:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            target.write(decompressor.decompress(chunk))
+        target.write(decompressor.flush())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from blog_generation import (
+    draft_blog_post,
+    refine_blog_post,
+    generate_title,
+    generate_trending_tags,
+    generate_image_prompt,
+)
+from instrumentation import tracer
+
+# Drafting steps in order. A draft can be cancelled or resumed between any two steps.
+STEPS = (
+    ("draft", lambda topic, data, post: draft_blog_post(topic, data)),
+    ("blog_post", lambda topic, data, post: refine_blog_post(post["draft"])),
+    ("title", lambda topic, data, post: generate_title(post["blog_post"])),
+    ("tags", lambda topic, data, post: generate_trending_tags(post["blog_post"])),
+    ("image_prompt", lambda topic, data, post: generate_image_prompt(post["blog_post"])),
+)
+
+class Draft:
+    """Progress of one candidate topic through STEPS."""
+
+    def __init__(self, index, topic):
+        self.index = index
+        self.topic = topic
+        self.post = {}
+        self.seconds = 0.0
+        self.failed = False
+        self.cancelled = threading.Event()
+        self.future = None
+
+    @property
+    def complete(self):
+        return self.failed or all(name in self.post for name, _ in STEPS)
+
+class SpeculativeDrafter:
+    def __init__(self, data, candidates=2, concurrency=2, priority=None, stats_path="metrics/speculation.jsonl"):
+        """
+        Initialize the SpeculativeDrafter.
+
+        While the user picks a topic on Telegram, posts for the top-ranked candidates
+        are drafted in the background. When the choice arrives, the other drafts are
+        cancelled after their current LLM call. The chosen draft is used as far as it
+        got, and is finished from there, or started then if it was still queued.
+
+        Parameters:
+        - data (dict): Articles data with main topics and content.
+        - candidates (int): Number of top-ranked topics to draft.
+        - concurrency (int): Drafts generated at the same time.
+        - priority (list): Option indices (0-based) in the order they should be drafted;
+          defaults to rank order.
+        - stats_path (str): JSON lines file receiving per-run hit and time-saved figures.
+        """
+        self.data = data
+        self.candidates = candidates
+        self.concurrency = concurrency
+        self.priority = priority
+        self.stats_path = stats_path
+        self.drafts = {}
+        self.started_at = None
+        self._executor = None
+
+    def start(self, topics):
+        """
+        Start drafting. Call right after the options are sent.
+
+        Parameters:
+        - topics (list): Topic of each option, in option order.
+        """
+        order = self.priority if self.priority is not None else range(len(topics))
+        order = [index for index in order if 0 <= index < len(topics)][:self.candidates]
+        if not order:
+            return
+        self.started_at = time.perf_counter()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="speculative-draft")
+        for index in order:
+            draft = Draft(index, topics[index])
+            self.drafts[index] = draft
+            draft.future = self._executor.submit(self._run, draft)
+
+    def resolve(self, index, topic):
+        """
+        Return the post for the chosen option, cancelling the other drafts.
+
+        Parameters:
+        - index (int): Chosen option (0-based).
+        - topic (str): Chosen topic.
+
+        A chosen draft that failed (e.g. on a transient LLM error) is retried once from
+        its last completed step.
+
+        Returns:
+        - tuple: (post, stats). post is {"blog_post", "title", "tags", "image_prompt"}
+          or None if generation failed. stats is {"hit", "ready", "saved_seconds",
+          "wasted_seconds", "wait_seconds"}. Here wasted_seconds only covers the discarded
+          drafts' work so far; the line written to stats_path is recorded once their
+          current LLM calls have finished.
+        """
+        selected_at = time.perf_counter()
+        chosen = self.drafts.get(index)
+        hit = chosen is not None
+        ready = hit and chosen.complete and not chosen.failed
+        self.cancel(keep=index)
+
+        if chosen is None:
+            chosen = Draft(index, topic)
+            self._run(chosen)
+        elif chosen.future.cancel():
+            # Still queued behind other candidates: draft it now instead of waiting for a slot.
+            self._run(chosen)
+        else:
+            chosen.future.result()
+        if chosen.failed:
+            print(f"Retrying the draft for '{topic}'.")
+            chosen.failed = False
+            self._run(chosen)
+        wait_seconds = time.perf_counter() - selected_at
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+        stats = {
+            "hit": hit,
+            "ready": ready,
+            "topic_rank": index + 1,
+            # Drafting from scratch would have taken chosen.seconds; only wait_seconds of it remained.
+            "saved_seconds": max(chosen.seconds - wait_seconds, 0.0),
+            "wait_seconds": wait_seconds,
+            "wasted_seconds": sum(draft.seconds for i, draft in self.drafts.items() if i != index),
+            "selection_seconds": selected_at - self.started_at if self.started_at is not None else None,
+        }
+        tracer.count("speculation_hits" if hit else "speculation_misses", 1)
+        self._record_when_stopped(dict(stats), [draft for i, draft in self.drafts.items() if i != index])
+
+        if chosen.failed or chosen.post.get("draft") is None:
+            return None, stats
+        return {name: chosen.post[name] for name, _ in STEPS if name != "draft"}, stats
+
+    def cancel(self, keep=None):
+        """Cancel every draft except `keep`; running ones stop after their current step."""
+        for index, draft in self.drafts.items():
+            if index != keep:
+                draft.cancelled.set()
+                draft.future.cancel()
+
+    def close(self):
+        """Cancel all drafts, e.g. when the run ends without a selection."""
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _record_when_stopped(self, stats, discarded):
+        # A non-daemon thread, so the line is still written if the run ends first.
+        def record():
+            wait([draft.future for draft in discarded])
+            stats["wasted_seconds"] = sum(draft.seconds for draft in discarded)
+            self._write_stats(stats)
+
+        threading.Thread(target=record, name="speculation-stats").start()
+
+    def _run(self, draft):
+        with tracer.span("speculative_draft", topic=draft.topic, rank=draft.index + 1):
+            for name, step in STEPS:
+                if draft.cancelled.is_set() or draft.failed:
+                    return
+                if name in draft.post:
+                    continue
+                start = time.perf_counter()
+                try:
+                    draft.post[name] = step(draft.topic, self.data, draft.post)
+                except Exception as e:
+                    print(f"Drafting '{draft.topic}' failed at {name}: {e}")
+                    draft.failed = True
+                draft.seconds += time.perf_counter() - start
+                if name == "draft" and "draft" in draft.post and draft.post["draft"] is None:
+                    # Dropped so that a retry drafts it again.
+                    del draft.post["draft"]
+                    draft.failed = True
+
+    def _write_stats(self, stats):
+        if not self.stats_path:
+            return
+        directory = os.path.dirname(self.stats_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.stats_path, "a") as f:
+            f.write(json.dumps({"time": time.time(), **stats}) + "\n")
+
+def summarize_stats(stats_path="metrics/speculation.jsonl"):
+    """
+    Hit rate and time saved over every recorded run.
+
+    Returns:
+    - dict: {"runs", "hit_rate", "ready_rate", "saved_seconds", "wasted_seconds"}, or None without data.
+    """
+    if not os.path.exists(stats_path):
+        return None
+    with open(stats_path) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    if not runs:
+        return None
+    return {
+        "runs": len(runs),
+        "hit_rate": sum(run["hit"] for run in runs) / len(runs),
+        "ready_rate": sum(run["ready"] for run in runs) / len(runs),
+        "saved_seconds": sum(run["saved_seconds"] for run in runs),
+        "wasted_seconds": sum(run["wasted_seconds"] for run in runs),
+    }
+
+if __name__ == "__main__":
+    summary = summarize_stats()
+    if summary is None:
+        print("No speculation stats recorded yet.")
+    else:
+        print(
+            f"{summary['runs']} runs: hit rate {summary['hit_rate']:.0%}, draft ready at selection {summary['ready_rate']:.0%}, "
+            f"saved {summary['saved_seconds']:.0f}s, spent {summary['wasted_seconds']:.0f}s on discarded drafts"
+        )
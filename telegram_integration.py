@@ -1,14 +1,232 @@
 import requests
+import atexit
+import json
+import queue
+import secrets
+import ssl
+import threading
 import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+class WebhookServer:
+    def __init__(self, host="0.0.0.0", port=8443, path="/telegram-webhook", secret_token=None, certfile=None, keyfile=None):
+        """
+        Small HTTP server that receives Telegram updates pushed to a webhook.
+
+        Telegram only delivers to HTTPS URLs; either pass a certificate here or
+        run the server behind a TLS-terminating reverse proxy or tunnel.
+
+        Parameters:
+        - host (str): Interface to listen on.
+        - port (int): Port to listen on (0 picks a free port).
+        - path (str): URL path that accepts updates.
+        - secret_token (str): Expected X-Telegram-Bot-Api-Secret-Token header value.
+        - certfile (str): Optional TLS certificate file.
+        - keyfile (str): Optional TLS private key file.
+        """
+        self.path = path
+        self.secret_token = secret_token
+        self.updates = queue.Queue()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                if self.path != server.path or (
+                    server.secret_token and self.headers.get("X-Telegram-Bot-Api-Secret-Token") != server.secret_token
+                ):
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                try:
+                    server.updates.put(json.loads(body))
+                except ValueError:
+                    pass
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="telegram-webhook", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def clear(self):
+        """
+        Drop updates that arrived before now.
+        """
+        while True:
+            try:
+                self.updates.get_nowait()
+            except queue.Empty:
+                return
+
+# Telegram rejects messages longer than this many characters.
+MAX_MESSAGE_LENGTH = 4096
+
+class NotificationQueue:
+    def __init__(self, bot, coalesce_window=0.5):
+        """
+        Deliver status messages from a background thread so the pipeline never waits on Telegram.
+
+        Messages queued within `coalesce_window` seconds of each other are joined into a
+        single Telegram message (up to MAX_MESSAGE_LENGTH characters), cutting round trips
+        and keeping bursts under Telegram's rate limits.
+
+        Parameters:
+        - bot (TelegramBot): Bot used to deliver the messages.
+        - coalesce_window (float): Seconds to wait for more messages before sending.
+        """
+        self.bot = bot
+        self.coalesce_window = coalesce_window
+        self.messages = queue.Queue()
+        self.sent_batches = 0
+        self.failed_messages = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name="telegram-notifications", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, message):
+        """
+        Queue a message for delivery and return immediately.
+        """
+        if self._closed:
+            self.bot.send_message(message)
+            return
+        self.messages.put(message)
+
+    def flush(self, timeout=30):
+        """
+        Wait until every queued message has been delivered (or given up on).
+
+        Parameters:
+        - timeout (float): Maximum seconds to wait.
+
+        Returns:
+        - bool: True if the queue was drained, False on timeout.
+        """
+        deadline = time.time() + timeout
+        with self.messages.all_tasks_done:
+            while self.messages.unfinished_tasks:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.messages.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=30):
+        """
+        Flush pending messages and stop the background sender.
+        """
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self.messages.put(None)
+        self._thread.join(timeout)
+
+    def _worker(self):
+        carry = None
+        while True:
+            message = carry if carry is not None else self.messages.get()
+            carry = None
+            if message is None:
+                self.messages.task_done()
+                return
+            batch = [message[:MAX_MESSAGE_LENGTH]]
+            length = len(batch[0])
+            deadline = time.time() + self.coalesce_window
+            while True:
+                remaining = deadline - time.time()
+                try:
+                    message = self.messages.get(timeout=remaining) if remaining > 0 else self.messages.get_nowait()
+                except queue.Empty:
+                    break
+                if message is None or length + len(message) + 1 > MAX_MESSAGE_LENGTH:
+                    # Send what we have; the sentinel or the message that did not fit goes next.
+                    carry = message
+                    break
+                batch.append(message)
+                length += len(message) + 1
+
+            if self.bot.send_message("\n".join(batch)):
+                self.sent_batches += 1
+            else:
+                self.failed_messages += len(batch)
+            for _ in batch:
+                self.messages.task_done()
 
 class TelegramBot:
-    def __init__(self, bot_token, chat_id):
+    def __init__(self, bot_token, chat_id, api_url="https://api.telegram.org", poll_timeout=30,
+                 webhook_url=None, webhook_listen=("0.0.0.0", 8443), webhook_secret=None,
+                 webhook_certfile=None, webhook_keyfile=None, coalesce_window=None, max_retries=5):
+        """
+        Initialize the TelegramBot.
+
+        By default button presses are received by long-polling `getUpdates`. If
+        `webhook_url` is given, Telegram pushes them to a local WebhookServer instead.
+
+        Parameters:
+        - bot_token (str): Telegram bot token.
+        - chat_id (str): Chat ID that receives messages.
+        - api_url (str): Base URL of the Telegram Bot API.
+        - poll_timeout (int): Server-side long-polling timeout in seconds.
+        - webhook_url (str): Public HTTPS URL that reaches the local webhook server.
+        - webhook_listen (tuple): (host, port) the webhook server listens on.
+        - webhook_secret (str): Secret token Telegram sends with each update; generated if omitted.
+        - webhook_certfile (str): Optional TLS certificate for the webhook server.
+        - webhook_keyfile (str): Optional TLS private key for the webhook server.
+        - coalesce_window (float): If set, `notify` delivers messages through a background
+          NotificationQueue that merges messages sent within this many seconds.
+        - max_retries (int): Attempts per message on rate limiting or network errors.
+        """
         self.bot_token = bot_token
         self.chat_id = chat_id
+        self.base_url = f"{api_url.rstrip('/')}/bot{bot_token}"
+        self.poll_timeout = poll_timeout
+        self.max_retries = max_retries
+        self.update_offset = None
+        # One pooled session for every Bot API call, shared by the notification sender.
+        self.session = requests.Session()
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=4))
+        self.session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=4))
+        self.notifications = NotificationQueue(self, coalesce_window) if coalesce_window is not None else None
+        self.webhook_url = webhook_url
+        self.webhook = None
+        if webhook_url:
+            self.webhook = WebhookServer(
+                host=webhook_listen[0],
+                port=webhook_listen[1],
+                path=urlsplit(webhook_url).path or "/",
+                secret_token=webhook_secret or secrets.token_urlsafe(32),
+                certfile=webhook_certfile,
+                keyfile=webhook_keyfile,
+            )
 
     def send_message(self, message):
         """
-        Send a message to the Telegram chat.
+        Send a message to the Telegram chat, waiting for delivery.
+
+        Honors Telegram's `retry_after` on 429 responses and retries network errors
+        with backoff, up to `max_retries` attempts.
 
         Parameters:
         - message (str): The message to send.
@@ -16,20 +234,51 @@ class TelegramBot:
         Returns:
         - bool: True if the message was sent successfully, False otherwise.
         """
-        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-        data = {"chat_id": self.chat_id, "text": message}
-        response = requests.post(url, json=data)
-        return response.status_code == 200
+        response = self._post_message({"chat_id": self.chat_id, "text": message})
+        return response is not None and response.status_code == 200
+
+    def notify(self, message):
+        """
+        Send a status message without waiting for delivery.
+
+        Falls back to a blocking send when no notification queue is configured.
+
+        Parameters:
+        - message (str): The message to send.
+        """
+        if self.notifications is None:
+            self.send_message(message)
+        else:
+            self.notifications.put(message)
+
+    def flush(self, timeout=30):
+        """
+        Wait for queued status messages to be delivered.
+        """
+        if self.notifications is not None:
+            self.notifications.flush(timeout)
+
+    def close(self):
+        """
+        Deliver queued status messages, stop the webhook if one is running and close the session.
+        """
+        if self.notifications is not None:
+            self.notifications.close()
+        self.stop_webhook()
+        self.session.close()
 
     def send_options(self, top_topics):
         """
         Send options for the top topics as inline buttons.
 
+        Sent with the same retries as send_message.
+
         Parameters:
         - top_topics (list): List of topics to display as options.
-        """
-        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
 
+        Returns:
+        - bool: True if the options were sent successfully, False otherwise.
+        """
         # Define options as inline buttons
         options = []
         for idx, topic in enumerate(top_topics, start=1):
@@ -42,23 +291,112 @@ class TelegramBot:
             "reply_markup": {"inline_keyboard": options}
         }
 
-        response = requests.post(url, json=data)
-        if response.status_code == 200:
+        # Keep the chat in order: earlier status messages go out before the options.
+        self.flush()
+        response = self._post_message(data)
+        if response is not None and response.status_code == 200:
             print("Options sent successfully.")
-        else:
-            print("Failed to send options:", response.text)
+            return True
+        print("Failed to send options:", response.text if response is not None else "no response")
+        return False
+
+    def start_webhook(self):
+        """
+        Start the local webhook server and register its URL with Telegram.
+
+        Returns:
+        - bool: True if Telegram accepted the webhook, False otherwise.
+        """
+        self.webhook.start()
+        data = {
+            "url": self.webhook_url,
+            "secret_token": self.webhook.secret_token,
+            "allowed_updates": ["callback_query"],
+            "drop_pending_updates": True,
+        }
+        try:
+            response = self.session.post(f"{self.base_url}/setWebhook", json=data)
+        except requests.RequestException as e:
+            print("Failed to set webhook:", e)
+            return False
+        if response.status_code != 200:
+            print("Failed to set webhook:", response.text)
+            return False
+        print(f"Webhook registered at {self.webhook_url}.")
+        return True
+
+    def stop_webhook(self):
+        """
+        Unregister the webhook and stop the local server, so getUpdates works again.
+        """
+        if self.webhook is not None and self.webhook.thread.is_alive():
+            try:
+                self.session.post(f"{self.base_url}/deleteWebhook")
+            except requests.RequestException as e:
+                print("Failed to delete webhook:", e)
+            self.webhook.stop()
+
+    def get_updates(self, timeout=0):
+        """
+        Fetch new callback-query updates, long-polling for up to `timeout` seconds.
+
+        Updates are confirmed by advancing the offset, so each is returned only once.
+
+        Parameters:
+        - timeout (int): Server-side long-polling timeout in seconds.
+
+        Returns:
+        - list: New updates (possibly empty).
+        """
+        params = {"timeout": timeout, "allowed_updates": json.dumps(["callback_query"])}
+        if self.update_offset is not None:
+            params["offset"] = self.update_offset
+        try:
+            response = self.session.get(f"{self.base_url}/getUpdates", params=params, timeout=timeout + 10)
+            data = response.json()
+        except Exception as e:
+            print(f"Error fetching updates: {e}")
+            time.sleep(1)
+            return []
+
+        if not data.get("ok"):
+            print("Failed to fetch updates:", data.get("description"))
+            time.sleep(1)
+            return []
+        updates = data.get("result", [])
+        if updates:
+            self.update_offset = updates[-1]["update_id"] + 1
+        return updates
+
+    def answer_callback_query(self, callback_query_id):
+        """
+        Acknowledge a button press so the Telegram client stops showing a spinner.
+
+        Best effort: a failed acknowledgement must not lose the selection itself.
+        """
+        try:
+            self.session.post(
+                f"{self.base_url}/answerCallbackQuery", json={"callback_query_id": callback_query_id}, timeout=5
+            )
+        except requests.RequestException as e:
+            print(f"Could not acknowledge the button press: {e}")
 
     def clear_old_updates(self):
         """
         Clear old updates to avoid processing outdated messages.
         """
-        url = f"https://api.telegram.org/bot{self.bot_token}/getUpdates"
-        response = requests.get(url)
+        if self.webhook is not None:
+            self.webhook.clear()
+            return
+
+        # offset=-1 returns only the most recent pending update instead of the whole backlog.
+        response = self.session.get(f"{self.base_url}/getUpdates", params={"offset": -1, "timeout": 0})
         data = response.json()
 
-        if data["ok"] and "result" in data and len(data["result"]) > 0:
-            last_update_id = data["result"][-1]["update_id"]
-            requests.get(f"{url}?offset={last_update_id + 1}")
+        if data.get("ok") and data.get("result"):
+            self.update_offset = data["result"][-1]["update_id"] + 1
+            # Confirm it so Telegram discards everything up to and including it.
+            self.session.get(f"{self.base_url}/getUpdates", params={"offset": self.update_offset, "timeout": 0})
         else:
             print("No old updates to clear.")
 
@@ -70,33 +408,58 @@ class TelegramBot:
         - timeout (int): Timeout in seconds to wait for the user's response.
 
         Returns:
-        - str: The callback data of the selected option, or None if no selection is made.
+        - str: The callback data of the selected option, or "Topic 1" if no selection is made.
         """
-        url = f"https://api.telegram.org/bot{self.bot_token}/getUpdates"
-        last_update_id = None
-        start_time = time.time()
+        deadline = time.time() + timeout
 
-        while time.time() - start_time < timeout:  # Wait for the specified timeout
-            response = requests.get(url)
-            data = response.json()
+        while time.time() < deadline:
+            remaining = deadline - time.time()
+            if self.webhook is not None:
+                try:
+                    updates = [self.webhook.updates.get(timeout=remaining)]
+                except queue.Empty:
+                    break
+            else:
+                updates = self.get_updates(timeout=max(1, min(self.poll_timeout, int(remaining))))
+
+            for update in updates:
+                # Check if there's a callback query (user clicked a button)
+                if "callback_query" in update:
+                    callback_query = update["callback_query"]
+                    self.answer_callback_query(callback_query["id"])
+                    self.notify(f"You selected: {callback_query['data']}")
+                    return callback_query["data"]
 
-            if data["ok"] and "result" in data:
-                for update in data["result"]:
-                    # Skip already processed updates
-                    if update["update_id"] == last_update_id:
-                        continue
-                    last_update_id = update["update_id"]
-
-                    # Check if there's a callback query (user clicked a button)
-                    if "callback_query" in update:
-                        callback_data = update["callback_query"]["data"]
-                        self.send_message(f"You selected: {callback_data}")
-                        return callback_data
-            time.sleep(2)  # Check every 2 seconds
-
-        self.send_message("No selection was made within the time limit. Proceeding with Topic 1.")
+        self.notify("No selection was made within the time limit. Proceeding with Topic 1.")
         return "Topic 1"
 
+    def _post_message(self, data):
+        """
+        POST to sendMessage, honoring `retry_after` on 429 responses and retrying
+        network errors with backoff, up to `max_retries` attempts.
+
+        Returns:
+        - Response: The final response, or None if no response was received.
+        """
+        url = f"{self.base_url}/sendMessage"
+        response = None
+        for attempt in range(self.max_retries):
+            try:
+                response = self.session.post(url, json=data, timeout=30)
+            except requests.exceptions.RequestException as e:
+                print(f"Error sending Telegram message: {e}")
+                time.sleep(2 ** attempt)
+                continue
+            if response.status_code == 429:
+                try:
+                    retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                except ValueError:
+                    retry_after = 1
+                time.sleep(retry_after)
+                continue
+            return response
+        return response
+
 if __name__ == "__main__":
     # Replace with your actual bot token and chat ID
     BOT_TOKEN = "your_telegram_bot_token_here"
@@ -0,0 +1,48 @@
+import coordination
+import main
+from coordination import WorkQueue
+
+
+def test_consecutive_cluster_runs_do_not_share_results(s3_manager, monkeypatch):
+    # Post generation echoes the topic, so a result reused from the previous run would show.
+    monkeypatch.setattr(coordination, "generate_post", lambda payload: {"topic": payload["topic"]})
+    topics = iter(["first topic", "second topic"])
+    runs = []
+
+    def run_pipeline(telegram, publisher, outbox, cluster=None, **kwargs):
+        topic = next(topics)
+        runs.append((cluster.run_id, topic, cluster.generate_post(topic, {})))
+
+    monkeypatch.setattr(main, "run_pipeline", run_pipeline)
+    settings = {**main.load_settings(), "TRACING_ENABLED": False, "SPECULATION_CANDIDATES": 0}
+    integrations = {
+        "telegram": None,
+        "publisher": None,
+        "outbox": None,
+        "s3_manager": s3_manager,
+        "work_queue": WorkQueue(s3_manager, worker_id="test", poll_interval=0.01),
+    }
+
+    main.run_traced(integrations, settings)
+    main.run_traced(integrations, settings)
+
+    (first_id, first_topic, first_post), (second_id, second_topic, second_post) = runs
+    assert first_id != second_id
+    assert first_post == {"topic": first_topic}
+    assert second_post == {"topic": second_topic}
+
+
+def test_result_is_discarded_when_lease_is_taken_over_during_the_task(s3_manager):
+    queue = WorkQueue(s3_manager, worker_id="slow", lease_seconds=60)
+    s3_manager.put_json(queue._key("run", "stage", "tasks", "0000"), {"n": 1})
+
+    def handler(payload):
+        # Another node takes the lease over between heartbeats.
+        key = queue._key("run", "stage", "leases", "0000")
+        current, etag = s3_manager.get_json(key)
+        s3_manager.put_json(key, {**current, "worker": "fast"}, if_match=etag)
+        return "stale"
+
+    lease = queue._claim("run", "stage", "0000")
+    assert queue._process(lease, handler) is False
+    assert s3_manager.get_json(queue._key("run", "stage", "results", "0000")) == (None, None)
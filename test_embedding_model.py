@@ -0,0 +1,11 @@
+from embedding_model import rank_topics
+
+
+def test_rank_topics_offers_one_topic_per_trend_first():
+    clustered_topics = {0: ["gpu a", "gpu b", "gpu a"], 1: ["llm a", "llm b"], 2: ["quiet"]}
+    trend_scores = {"gpu a": 5.0, "gpu b": 5.0, "llm a": 3.0, "llm b": 3.0, "quiet": 1.0}
+    trend_groups = {"gpu a": (0, 0.8), "gpu b": (0, 0.9), "llm a": (1, 0.95), "llm b": (1, 0.7), "quiet": (2, 1.0)}
+
+    top_topics = rank_topics(clustered_topics, trend_scores, trend_groups, n=4)
+
+    assert [topic for topic, _ in top_topics] == ["gpu b", "llm a", "quiet", "gpu a"]
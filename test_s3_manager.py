@@ -0,0 +1,115 @@
+import io
+import json
+import random
+import pytest
+from s3_manager import S3Manager, MIN_PART_SIZE
+
+PART_SIZE = MIN_PART_SIZE
+
+
+def stored(fake_s3, s3_manager, key):
+    return fake_s3.objects[(s3_manager.bucket_name, key)]
+
+
+def payload(size, seed=0):
+    # Random bytes do not compress, so gzip uploads still span several parts.
+    # getrandbits rather than randbytes, which needs Python 3.9.
+    return random.Random(seed).getrandbits(8 * size).to_bytes(size, "little")
+
+
+def test_part_size_below_s3_minimum_is_rejected(fake_s3):
+    env = fake_s3.env()
+    with pytest.raises(ValueError):
+        S3Manager("fake", "fake", env["AWS_REGION_NAME"], env["S3_BUCKET_NAME"],
+                  endpoint_url=env["S3_ENDPOINT_URL"], part_size=MIN_PART_SIZE - 1)
+
+
+def test_small_stream_is_stored_with_a_single_put(fake_s3, s3_manager):
+    etag = s3_manager.upload_stream("small.bin", io.BytesIO(b"hello"))
+    obj = stored(fake_s3, s3_manager, "small.bin")
+    assert obj["body"] == b"hello"
+    assert etag == obj["etag"]
+    assert "-" not in etag
+
+
+def test_large_stream_is_uploaded_in_parts(fake_s3, s3_manager):
+    data = payload(2 * PART_SIZE + 123)
+    etag = s3_manager.upload_stream("large.bin", io.BytesIO(data))
+    assert etag.endswith('-3"')
+    assert stored(fake_s3, s3_manager, "large.bin")["body"] == data
+    assert not fake_s3.uploads
+
+
+def test_upload_file_gzip_round_trips_through_download_file(fake_s3, s3_manager, tmp_path):
+    data = payload(PART_SIZE + 4096, seed=1)
+    source = tmp_path / "source.bin"
+    source.write_bytes(data)
+    etag = s3_manager.upload_file("gzip.bin", str(source), compress=True)
+    obj = stored(fake_s3, s3_manager, "gzip.bin")
+    assert etag.endswith('-2"')
+    assert obj["metadata"]["x-amz-meta-compression"] == "gzip"
+    assert obj["body"][:2] == b"\x1f\x8b"
+
+    target = tmp_path / "target.bin"
+    assert s3_manager.download_file("gzip.bin", str(target)) == etag
+    assert target.read_bytes() == data
+
+
+def test_download_file_fetches_every_range(s3_manager, tmp_path):
+    data = payload(2 * PART_SIZE + 1, seed=2)
+    s3_manager.upload_stream("ranges.bin", io.BytesIO(data))
+    target = tmp_path / "ranges.bin"
+    assert s3_manager.download_file("ranges.bin", str(target)) is not None
+    assert target.read_bytes() == data
+
+
+def test_download_file_of_missing_object_returns_none(s3_manager, tmp_path):
+    target = tmp_path / "missing.bin"
+    assert s3_manager.download_file("missing.bin", str(target)) is None
+    assert not target.exists()
+
+
+def test_read_range(s3_manager):
+    s3_manager.upload_bytes("range.txt", b"0123456789")
+    assert s3_manager.read_range("range.txt", 2, 5) == b"2345"
+    assert s3_manager.read_range("range.txt", 8, 100) == b"89"
+
+
+def test_read_range_errors_return_none(s3_manager):
+    assert s3_manager.read_range("missing.txt", 0, 10) is None
+    s3_manager.upload_bytes("range.txt", b"0123")
+    assert s3_manager.read_range("range.txt", 10, 20) is None
+
+
+def test_cached_path_reuses_copy_until_etag_changes(fake_s3, s3_manager):
+    s3_manager.save_json("corpus.json", {"version": 1})
+    path = s3_manager.cached_path("corpus.json")
+    with open(path) as f:
+        assert json.load(f) == {"version": 1}
+
+    requests = fake_s3.request_count
+    assert s3_manager.cached_path("corpus.json") == path
+    assert fake_s3.request_count == requests + 1  # HEAD only
+
+    s3_manager.save_json("corpus.json", {"version": 2})
+    assert s3_manager.cached_path("corpus.json") == path
+    assert s3_manager.load_json("corpus.json") == {"version": 2}
+
+
+def test_cached_path_refuses_keys_outside_cache_dir(s3_manager):
+    assert s3_manager.cached_path("../escape.json") is None
+
+
+def test_put_json_create_only_conflict(s3_manager):
+    etag = s3_manager.put_json("lease.json", {"worker": "a"}, if_none_match=True)
+    assert etag is not None
+    assert s3_manager.put_json("lease.json", {"worker": "b"}, if_none_match=True) is None
+    assert s3_manager.get_json("lease.json") == ({"worker": "a"}, etag)
+
+
+def test_put_json_compare_and_swap_conflict(s3_manager):
+    first = s3_manager.put_json("lease.json", {"renewals": 0})
+    second = s3_manager.put_json("lease.json", {"renewals": 1}, if_match=first)
+    assert second is not None and second != first
+    assert s3_manager.put_json("lease.json", {"renewals": 2}, if_match=first) is None
+    assert s3_manager.get_json("lease.json") == ({"renewals": 1}, second)
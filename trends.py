@@ -0,0 +1,328 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from instrumentation import tracer
+
+class TrendEngine:
+    def __init__(self, path="trends.npz", bucket_seconds=86400, window=28, short_window=1,
+                 similarity_threshold=0.7, max_topics=2000):
+        """
+        Initialize the TrendEngine.
+
+        Topic volume is kept per source as rolling counters in a ring of `window`
+        time buckets. There is one row per tracked topic, identified by the embedding
+        of the first article seen about it. A new article is counted for the most
+        similar tracked topic, or starts a new one. Articles are counted once, even
+        when later crawls list them again. An update costs O(new articles x tracked
+        topics) no matter how many articles were crawled before or how much history
+        the window holds, and the state is loaded
+        from and saved to `path` across runs.
+
+        Parameters:
+        - path (str): State file (.npz); None keeps the state in memory only.
+        - bucket_seconds (int): Length of one time bucket.
+        - window (int): Number of buckets kept.
+        - short_window (int): Most recent buckets compared against the older ones for the burst score.
+        - similarity_threshold (float): Minimum cosine similarity to count an article for a tracked topic.
+        - max_topics (int): Tracked topics; the quietest one is replaced when full.
+        """
+        if not 0 < short_window < window:
+            raise ValueError("short_window must be between 0 and window.")
+        self.path = path
+        self.bucket_seconds = bucket_seconds
+        self.window = window
+        self.short_window = short_window
+        self.similarity_threshold = similarity_threshold
+        self.max_topics = max_topics
+
+        self.labels = []
+        self.sources = []
+        # Preallocated, geometrically grown storage; `prototypes` and `counts` are views of the used part.
+        self._prototype_buffer = None
+        self._count_buffer = np.zeros((0, 0, window), dtype=np.float32)
+        self.head = None
+        self.first_bucket = None
+        self.seen = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    @property
+    def prototypes(self):
+        if self._prototype_buffer is None:
+            return None
+        return self._prototype_buffer[:len(self.labels)]
+
+    @property
+    def counts(self):
+        return self._count_buffer[:len(self.labels), :len(self.sources)]
+
+    def update(self, embeddings, sources, article_ids, labels, timestamp=None):
+        """
+        Count newly crawled articles.
+
+        Parameters:
+        - embeddings (array): One topic embedding per article.
+        - sources (list): Source of each article.
+        - article_ids (list): Stable ID of each article (e.g. its link); articles already
+          counted inside the window are skipped.
+        - labels (list): Topic text of each article, kept as the label of new topics.
+        - timestamp (float): Crawl time; defaults to now.
+
+        Returns:
+        - numpy.ndarray: Index of the tracked topic of every article; skipped articles keep
+          the topic they were counted for.
+        """
+        if len(article_ids) == 0:
+            return np.zeros(0, dtype=np.int64)
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(article_ids), -1)
+        with tracer.span("trend_update", articles=len(embeddings)):
+            bucket = int((time.time() if timestamp is None else timestamp) // self.bucket_seconds)
+            self._advance(bucket)
+
+            # Only articles not counted yet are matched against the tracked topics.
+            keys = [_article_key(article_id) for article_id in article_ids]
+            assignments = np.empty(len(keys), dtype=np.int64)
+            new = np.zeros(len(keys), dtype=bool)
+            batch = {}
+            for i, key in enumerate(keys):
+                if key in self.seen:
+                    assignments[i] = self.seen[key][1]
+                elif key in batch:
+                    assignments[i] = -1
+                else:
+                    batch[key] = i
+                    new[i] = True
+            new_rows = np.flatnonzero(new)
+            if len(new_rows):
+                in_use = {int(topic) for topic in assignments[~new] if topic >= 0}
+                assignments[new_rows] = self._assign(
+                    _normalize(embeddings[new_rows]), [labels[i] for i in new_rows], in_use
+                )
+            for i, key in enumerate(keys):
+                if assignments[i] < 0:
+                    assignments[i] = assignments[batch[key]]
+
+            in_window = bucket > self.head - self.window
+            if in_window and len(new_rows):
+                source_index = np.array([self._source_index(sources[i]) for i in new_rows], dtype=np.int64)
+                np.add.at(self.counts, (assignments[new_rows], source_index, bucket % self.window), 1)
+                for i in new_rows:
+                    self.seen[keys[i]] = (bucket, int(assignments[i]))
+            tracer.count("trend_new_articles", len(new_rows) if in_window else 0)
+        return assignments
+
+    def scores(self):
+        """
+        Trend score of every tracked topic.
+
+        Let x be a topic's total volume per bucket, over the buckets since tracking began:
+        - burst = (mean of the last `short_window` buckets - mean of the earlier ones)
+          / sqrt(variance + mean of the earlier ones + 1), a Poisson-style z-score.
+        - momentum = least-squares slope of x / (mean of x + 1).
+        - score = (burst + momentum) * sqrt(number of sources with recent articles).
+
+        Returns:
+        - numpy.ndarray: One score per tracked topic.
+        """
+        if not self.labels:
+            return np.zeros(0, dtype=np.float32)
+        order = np.arange(self.head - self.window + 1, self.head + 1)
+        series = self.counts[:, :, order % self.window]
+        valid = order >= self.first_bucket
+        totals = series.sum(axis=1) * valid
+
+        recent = totals[:, -self.short_window:].mean(axis=1)
+        base_mask = valid[:-self.short_window]
+        base_count = max(int(base_mask.sum()), 1)
+        base = totals[:, :-self.short_window]
+        base_mean = base.sum(axis=1) / base_count
+        base_var = (((base - base_mean[:, None]) ** 2) * base_mask).sum(axis=1) / base_count
+        burst = (recent - base_mean) / np.sqrt(base_var + base_mean + 1)
+
+        steps = np.arange(self.window, dtype=np.float32)
+        valid_count = int(valid.sum())
+        if valid_count >= 2:
+            centered = (steps - steps[valid].mean()) * valid
+            slope = totals @ centered / (centered ** 2).sum()
+            momentum = slope / (totals.sum(axis=1) / valid_count + 1)
+        else:
+            momentum = np.zeros(len(self.labels), dtype=np.float32)
+
+        breadth = (series[:, :, -self.short_window:].sum(axis=2) > 0).sum(axis=1)
+        return (burst + momentum) * np.sqrt(np.maximum(breadth, 1))
+
+    def similarity(self, embeddings, assignments):
+        """
+        Cosine similarity of articles to the topic they were assigned to.
+
+        Parameters:
+        - embeddings (array): One topic embedding per article.
+        - assignments (array): Tracked topic of each article, from update().
+
+        Returns:
+        - numpy.ndarray: One similarity per article.
+        """
+        if len(assignments) == 0:
+            return np.zeros(0, dtype=np.float32)
+        embeddings = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(assignments), -1))
+        return (embeddings * self.prototypes[np.asarray(assignments)]).sum(axis=1)
+
+    def top_trends(self, n=5):
+        """
+        Highest scoring tracked topics.
+
+        Returns:
+        - list: (label, score) tuples, highest score first.
+        """
+        scores = self.scores()
+        return [(self.labels[i], float(scores[i])) for i in np.argsort(-scores)[:n]]
+
+    def save(self):
+        """Write the state to `path` atomically."""
+        if not self.path:
+            return
+        meta = {
+            "labels": self.labels,
+            "sources": self.sources,
+            "head": self.head,
+            "first_bucket": self.first_bucket,
+            "bucket_seconds": self.bucket_seconds,
+            "window": self.window,
+        }
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            meta=np.array(json.dumps(meta)),
+            prototypes=self.prototypes if self.prototypes is not None else np.zeros((0, 0), dtype=np.float32),
+            counts=self.counts,
+            seen_keys=np.array(list(self.seen.keys()), dtype="U16"),
+            seen_buckets=np.array([seen_bucket for seen_bucket, _ in self.seen.values()], dtype=np.int64),
+            seen_topics=np.array([topic for _, topic in self.seen.values()], dtype=np.int64),
+        )
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".trends-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Read the state from `path`. A state with a different bucket length or window is discarded."""
+        try:
+            with np.load(self.path, allow_pickle=False) as state:
+                meta = json.loads(str(state["meta"]))
+                if meta["bucket_seconds"] != self.bucket_seconds or meta["window"] != self.window:
+                    print(f"Trend state in '{self.path}' uses different buckets; starting over.")
+                    return
+                seen = dict(zip(
+                    state["seen_keys"].tolist(),
+                    zip(state["seen_buckets"].tolist(), state["seen_topics"].tolist()),
+                ))
+                self.labels = meta["labels"]
+                self.sources = meta["sources"]
+                self.head = meta["head"]
+                self.first_bucket = meta["first_bucket"]
+                self._prototype_buffer = state["prototypes"] if self.labels else None
+                self._count_buffer = state["counts"]
+                self.seen = seen
+        except Exception as e:
+            print(f"Error loading trend state from '{self.path}': {e}")
+
+    def _advance(self, bucket):
+        if self.head is None:
+            self.head = self.first_bucket = bucket
+            return
+        if bucket <= self.head:
+            return
+        # Clear the buckets that rotate into the window, then forget articles that left it.
+        for skipped in range(self.head + 1, min(bucket, self.head + self.window) + 1):
+            self.counts[:, :, skipped % self.window] = 0
+        self.head = bucket
+        oldest = bucket - self.window
+        self.seen = {key: seen for key, seen in self.seen.items() if seen[0] > oldest}
+
+    def _assign(self, embeddings, labels, in_use):
+        assignments = np.full(len(embeddings), -1, dtype=np.int64)
+        if self.prototypes is not None and len(self.prototypes):
+            similarity = embeddings @ self.prototypes.T
+            best = similarity.argmax(axis=1)
+            matched = similarity[np.arange(len(embeddings)), best] >= self.similarity_threshold
+            assignments[matched] = best[matched]
+            in_use.update(best[matched].tolist())
+        # Unmatched articles may still match each other, so they start topics one at a time.
+        for i in np.flatnonzero(assignments < 0):
+            if self.prototypes is not None and len(self.prototypes):
+                similarity = self.prototypes @ embeddings[i]
+                best = int(similarity.argmax())
+                if similarity[best] >= self.similarity_threshold:
+                    assignments[i] = best
+                    continue
+            assignments[i] = self._add_topic(embeddings[i], labels[i], in_use)
+            in_use.add(int(assignments[i]))
+        return assignments
+
+    def _add_topic(self, embedding, label, in_use):
+        if len(self.labels) < self.max_topics:
+            slot = len(self.labels)
+            if self._prototype_buffer is None:
+                self._prototype_buffer = np.zeros((min(16, self.max_topics), len(embedding)), dtype=np.float32)
+            if slot == len(self._prototype_buffer):
+                capacity = min(2 * slot, self.max_topics)
+                self._prototype_buffer = _grow(self._prototype_buffer, 0, capacity)
+            if slot == len(self._count_buffer):
+                self._count_buffer = _grow(self._count_buffer, 0, len(self._prototype_buffer))
+            self._prototype_buffer[slot] = embedding
+            self._count_buffer[slot] = 0
+            self.labels.append(label)
+            return slot
+        # Replace the quietest topic, but not one this update has already counted articles for.
+        volume = self.counts.sum(axis=(1, 2))
+        if len(in_use) < len(volume):
+            volume[list(in_use)] = np.inf
+        slot = int(volume.argmin())
+        self._prototype_buffer[slot] = embedding
+        self.labels[slot] = label
+        self._count_buffer[slot] = 0
+        # The replaced topic's counts are gone, so its articles may be counted again.
+        self.seen = {key: seen for key, seen in self.seen.items() if seen[1] != slot}
+        return slot
+
+    def _source_index(self, source):
+        if source not in self.sources:
+            if len(self.sources) == self._count_buffer.shape[1]:
+                self._count_buffer = _grow(self._count_buffer, 1, max(4, 2 * len(self.sources)))
+            self._count_buffer[:, len(self.sources)] = 0
+            self.sources.append(source)
+        return self.sources.index(source)
+
+def _normalize(embeddings):
+    if embeddings.ndim == 1:
+        embeddings = embeddings[None, :]
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+def _grow(array, axis, size):
+    shape = list(array.shape)
+    shape[axis] = size - shape[axis]
+    return np.concatenate([array, np.zeros(shape, dtype=array.dtype)], axis=axis)
+
+def _article_key(article_id):
+    return hashlib.sha1(str(article_id).encode("utf-8")).hexdigest()[:16]
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    steady, rising = rng.normal(size=384), rng.normal(size=384)
+    engine = TrendEngine(path=None)
+    day = 86400
+    for d in range(14):
+        embeddings = [steady + rng.normal(scale=0.1, size=384) for _ in range(3)]
+        embeddings += [rising + rng.normal(scale=0.1, size=384) for _ in range(d // 3)]
+        labels = ["steady topic"] * 3 + ["rising topic"] * (d // 3)
+        ids = [f"day{d}-{i}" for i in range(len(embeddings))]
+        engine.update(embeddings, ["Dev.to"] * len(embeddings), ids, labels, timestamp=d * day)
+    for label, score in engine.top_trends():
+        print(f"{label}: {score:.2f}")